@@ -0,0 +1,72 @@
+from rollups import DowntimeRollup, pareto_series, top_values
+from schema import MINUTES_COLUMN
+from storage import filter_rows
+
+
+# Average Time to Resolve (minutes) above which a warning is raised
+HIGH_AVG_RESOLUTION_MINUTES = 30
+
+# Root causes listed in the insights and suggestions
+TOP_ROOT_CAUSES = 3
+
+# Columns shown for issues that took longer than average to resolve
+HIGH_RESOLUTION_COLUMNS = ["Key", "Process Name", "Downtime Reason", MINUTES_COLUMN]
+
+
+# Issue counts and average Time to Resolve of (filtered, typed) downtime rows
+def downtime_statistics(data):
+    total_issues = len(data)
+    open_issues = int((data["Status"] != "Closed").sum()) if "Status" in data.columns else total_issues
+    return {
+        "total_issues": total_issues,
+        "open_issues": open_issues,
+        "closed_issues": total_issues - open_issues,
+        "avg_resolution_time": float(data[MINUTES_COLUMN].mean()) if MINUTES_COLUMN in data.columns else float("nan"),
+    }
+
+
+# Issues that took longer than the average to resolve
+def high_resolution_issues(data):
+    minutes = data[MINUTES_COLUMN]
+    return data[minutes > minutes.mean()]
+
+
+# Recommendations (markdown lines) and an optional warning, from the insights
+def suggestions(top_root_causes, high_resolution, avg_resolution_time):
+    recommendations = [f"**Implement a Preventive Maintenance Plan for:** {cause}" for cause in top_root_causes.index]
+    if len(top_root_causes) > 1:
+        recommendations.append("**Review standard operating procedures (SOPs)** for recurring downtime issues.")
+        recommendations.append("**Provide additional training** for operators on handling the most common issues.")
+    if not high_resolution.empty:
+        recommendations.append("**Investigate downtime issues with unusually high resolution times** and optimize "
+                               "response strategies.")
+    warning = None
+    if avg_resolution_time > HIGH_AVG_RESOLUTION_MINUTES:
+        warning = "⚠️ High average resolution time detected! Consider faster troubleshooting processes."
+    return recommendations, warning
+
+
+# Everything the Downtime Issues view shows, for one set of typed rows:
+# statistics, Pareto series, top root causes, high-resolution-time issues,
+# monthly trend and suggestions. filtered (data limited to the date range and
+# open issues) and rollup (a DowntimeRollup of data) are built when not given.
+def downtime_report(data, start_date=None, end_date=None, open_only=False, filtered=None, rollup=None,
+                    top_n=TOP_ROOT_CAUSES):
+    if filtered is None:
+        filtered = filter_rows(data, start_date, end_date, open_only)
+    if rollup is None:
+        rollup = DowntimeRollup()
+        rollup.sync(data)
+    statistics = downtime_statistics(filtered)
+    top_root_causes = top_values(rollup, "Root Cause", top_n, start_date, end_date, open_only=open_only)
+    high_resolution = high_resolution_issues(filtered)
+    recommendations, warning = suggestions(top_root_causes, high_resolution, statistics["avg_resolution_time"])
+    return {
+        "statistics": statistics,
+        "pareto": pareto_series(rollup, "Downtime Reason", start_date, end_date, open_only=open_only),
+        "top_root_causes": top_root_causes,
+        "high_resolution": high_resolution,
+        "monthly_trend": rollup.monthly(start_date, end_date)["open_minutes" if open_only else "minutes"],
+        "recommendations": recommendations,
+        "warning": warning,
+    }
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from keys import KEY_LENGTH
+
+
+# Value pools for synthetic rows; a few values dominate, like real downtime logs
+PROCESS_NAMES = [f"Line {n}" for n in range(1, 13)]
+DOWNTIME_REASONS = ["Jam", "Changeover", "Sensor Fault", "Material Shortage", "Electrical", "Hydraulic",
+                    "Operator Error", "Tooling", "Quality Hold", "Software", "Maintenance", "Other"]
+ROOT_CAUSES = ["Worn Part", "Misalignment", "Loose Connection", "Late Delivery", "Training", "Firmware",
+               "Contamination", "Overheating", "Setup Error", "Unknown"]
+STATUSES = ["Open", "In Progress", "Closed"]
+TASK_STATUSES = ["Not Started", "Open", "In Progress", "Completed"]
+PRIORITIES = ["Low", "Medium", "High"]
+
+
+def _skewed(rng, values, n):
+    weights = 1.0 / np.arange(1, len(values) + 1)
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=weights / weights.sum())]
+
+
+def _keys(rng, n):
+    # Random hex keys shaped like new_key() (leading letter other than "e");
+    # 44 random bits makes collisions negligible at these sizes
+    first = np.asarray(list("abcdf"))[rng.integers(0, 5, size=n)]
+    rest = pd.Series(rng.integers(0, 16 ** (KEY_LENGTH - 1), size=n, dtype=np.int64)).map(
+        f"{{:0{KEY_LENGTH - 1}x}}".format)
+    return first + rest
+
+
+def _clock(minutes):
+    minutes = pd.Series(minutes)
+    return (minutes // 60).astype(str).str.zfill(2) + ":" + (minutes % 60).astype(str).str.zfill(2) + ":00"
+
+
+# n "Downtime Issues" rows in sheet form (text dates, blanks as ""), spread
+# over `days` days ending at `end`. closed_share of the issues are Closed.
+def downtime_rows(n, seed=0, days=730, end="2025-01-01", closed_share=0.7):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp(end) - pd.to_timedelta(rng.integers(0, days, size=n), unit="D")
+    minutes = rng.gamma(2.0, 15.0, size=n).round().astype(int)
+    closed = rng.random(n) < closed_share
+    status = np.where(closed, "Closed", np.where(rng.random(n) < 0.5, "Open", "In Progress"))
+    resolution = np.where(closed, (dates + pd.to_timedelta(minutes, unit="m")).strftime("%Y-%m-%d %H:%M:%S"), "")
+    return pd.DataFrame({
+        "Key": _keys(rng, n),
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Time": _clock(rng.integers(0, 24 * 60, size=n)),
+        "Process Name": _skewed(rng, PROCESS_NAMES, n),
+        "Downtime Reason": _skewed(rng, DOWNTIME_REASONS, n),
+        "Action Taken": "Reset and restarted",
+        "Root Cause": _skewed(rng, ROOT_CAUSES, n),
+        "Time to Resolve (Minutes)": minutes,
+        "Resolved (Y/N)": np.where(closed, "Y", "N"),
+        "Status": status,
+        "Resolution Time": resolution,
+    })
+
+
+# n "Personal Productivity" tasks in sheet form, due within +/- 60 days of `today`
+def productivity_rows(n, seed=0, today="2025-01-01"):
+    rng = np.random.default_rng(seed)
+    due = pd.Timestamp(today) + pd.to_timedelta(rng.integers(-60, 60, size=n), unit="D")
+    status = _skewed(rng, TASK_STATUSES, n)
+    closed = status == "Completed"
+    return pd.DataFrame({
+        "Key": _keys(rng, n),
+        "Task Name": pd.Series(np.arange(n)).map("Task {}".format),
+        "Priority": _skewed(rng, PRIORITIES, n),
+        "Due Date": due.strftime("%Y-%m-%d"),
+        "Status": status,
+        "Actual Close Date": np.where(closed, due.strftime("%Y-%m-%d"), ""),
+    })
+
+
+# A year of daily "KPI Dashboard" rows
+def kpi_rows(days=365, seed=0, end="2025-01-01"):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=end, periods=days, freq="D")
+    return pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "OEE": rng.normal(0.8, 0.05, size=days).round(3),
+        "Downtime (Minutes)": rng.gamma(4.0, 30.0, size=days).round(),
+    })
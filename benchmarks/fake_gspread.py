@@ -0,0 +1,220 @@
+import re
+import threading
+import time
+from collections import Counter
+
+import gspread
+from gspread.cell import Cell
+from gspread.utils import numericise_all, rowcol_to_a1
+
+
+# "A10:K", "B5", "A2:C7" -> (first row, first col, last row or None, last col)
+_RANGE = re.compile(r"^([A-Z]+)(\d+)?(?::([A-Z]+)(\d+)?)?$")
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+# In-process stand-in for a gspread client, for benchmarks and running the
+# app without Google (see demo_client). Supports the calls the app makes
+# (open, worksheet, get_all_records, get, row_values, append_rows,
+# update_cell, find, batch_update, batch_get, get_lastUpdateTime), sleeps `latency` seconds per call to simulate a
+# round trip, and counts calls and rows transferred per method.
+class FakeClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.rows_transferred = Counter()
+        self.spreadsheets = {}
+        self._lock = threading.Lock()
+
+    def _call(self, method, rows=0):
+        with self._lock:
+            self.calls[method] += 1
+            self.rows_transferred[method] += rows
+        if self.latency:
+            time.sleep(self.latency)
+
+    # Create (or replace) a worksheet from a header list and rows of cell values
+    def add_worksheet(self, sheet_name, worksheet_name, header, rows=()):
+        spreadsheet = self.spreadsheets.setdefault(sheet_name, FakeSpreadsheet(self, sheet_name))
+        worksheet = FakeWorksheet(self, worksheet_name, header, rows, spreadsheet)
+        spreadsheet.worksheets[worksheet_name] = worksheet
+        return worksheet
+
+    # Create a worksheet from a DataFrame (cells are stored as text, like the Sheets API returns them)
+    def add_dataframe(self, sheet_name, worksheet_name, data):
+        rows = data.astype(object).where(data.notna(), "").astype(str).values.tolist()
+        return self.add_worksheet(sheet_name, worksheet_name, [str(c) for c in data.columns], rows)
+
+    def open(self, title):
+        self._call("open")
+        if title not in self.spreadsheets:
+            raise gspread.exceptions.SpreadsheetNotFound(title)
+        return self.spreadsheets[title]
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.rows_transferred.clear()
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, title):
+        self.client = client
+        self.title = title
+        self.worksheets = {}
+        self.revision = 0
+
+    # Stands in for the Drive modifiedTime; bumped by every write to any worksheet
+    def get_lastUpdateTime(self):
+        self.client._call("get_lastUpdateTime")
+        return str(self.revision)
+
+    def worksheet(self, title):
+        self.client._call("worksheet")
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+
+class FakeWorksheet:
+    def __init__(self, client, title, header, rows=(), spreadsheet=None):
+        self.client = client
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.header = list(header)
+        self.rows = [list(map(str, row)) for row in rows]
+        self._lock = threading.Lock()
+
+    def _modified(self):
+        if self.spreadsheet is not None:
+            self.spreadsheet.revision += 1
+
+    # Cell values of the whole sheet, header first
+    def _grid(self):
+        return [self.header] + self.rows
+
+    def _ensure(self, row, col):
+        while len(self.rows) < row - 1:
+            self.rows.append([])
+        cells = self.header if row == 1 else self.rows[row - 2]
+        while len(cells) < col:
+            cells.append("")
+        return cells
+
+    def _range(self, range_name):
+        match = _RANGE.match(range_name.replace("$", ""))
+        if not match:
+            raise ValueError(f"Unsupported range: {range_name}")
+        first_col, first_row, last_col, last_row = match.groups()
+        first_row = int(first_row) if first_row else 1
+        first_col = _column_number(first_col)
+        if last_col is None:
+            return first_row, first_col, first_row, first_col
+        return first_row, first_col, int(last_row) if last_row else None, _column_number(last_col)
+
+    def _values(self, range_name):
+        first_row, first_col, last_row, last_col = self._range(range_name)
+        grid = self._grid()
+        last_row = len(grid) if last_row is None else min(last_row, len(grid))
+        values = []
+        for cells in grid[first_row - 1:last_row]:
+            values.append([str(v) for v in cells[first_col - 1:last_col]])
+        while values and not any(values[-1]):
+            values.pop()
+        return values
+
+    def get_all_records(self, **kwargs):
+        with self._lock:
+            rows = [row + [""] * (len(self.header) - len(row)) for row in self.rows]
+        self.client._call("get_all_records", len(rows))
+        return [dict(zip(self.header, numericise_all(row))) for row in rows]
+
+    def get(self, range_name, **kwargs):
+        with self._lock:
+            values = self._values(range_name)
+        self.client._call("get", len(values))
+        return values
+
+    def batch_get(self, ranges, **kwargs):
+        with self._lock:
+            values = [self._values(range_name) for range_name in ranges]
+        self.client._call("batch_get", sum(len(v) for v in values))
+        return values
+
+    def row_values(self, row, **kwargs):
+        with self._lock:
+            grid = self._grid()
+            values = [str(v) for v in grid[row - 1]] if row <= len(grid) else []
+        self.client._call("row_values", 1)
+        return values
+
+    def cell(self, row, col, **kwargs):
+        with self._lock:
+            grid = self._grid()
+            value = grid[row - 1][col - 1] if row <= len(grid) and col <= len(grid[row - 1]) else ""
+        self.client._call("cell", 1)
+        return Cell(row, col, str(value))
+
+    def find(self, query, **kwargs):
+        self.client._call("find", len(self.rows) + 1)
+        with self._lock:
+            for row, cells in enumerate(self._grid(), start=1):
+                for col, value in enumerate(cells, start=1):
+                    if str(value) == str(query):
+                        return Cell(row, col, str(value))
+        return None
+
+    # Returns the API's response, whose updates.updatedRange tells where the rows went
+    def append_rows(self, values, **kwargs):
+        with self._lock:
+            first_row = len(self.rows) + 2
+            self.rows.extend([str(v) for v in row] for row in values)
+            self._modified()
+        self.client._call("append_rows", len(values))
+        width = max((len(row) for row in values), default=1)
+        updated = f"'{self.title}'!A{first_row}:{rowcol_to_a1(1, width)[:-1]}{first_row + len(values) - 1}"
+        return {"tableRange": f"'{self.title}'!A1", "updates": {"updatedRange": updated, "updatedRows": len(values)}}
+
+    def update_cell(self, row, col, value):
+        with self._lock:
+            self._ensure(row, col)[col - 1] = str(value)
+            self._modified()
+        self.client._call("update_cell", 1)
+
+    def batch_update(self, data, **kwargs):
+        with self._lock:
+            for update in data:
+                first_row, first_col, _, _ = self._range(update["range"])
+                for r, row_values in enumerate(update["values"]):
+                    for c, value in enumerate(row_values):
+                        self._ensure(first_row + r, first_col + c)[first_col + c - 1] = str(value)
+            self._modified()
+        self.client._call("batch_update", len(data))
+
+    @property
+    def row_count(self):
+        return len(self.rows) + 1
+
+
+# A fake client holding the app's three worksheets filled with generated data
+# (rows downtime issues, tasks productivity tasks), for running the app
+# without Google (demo_rows setting) and benchmarking it under AppTest. The
+# last one made is kept in demo_clients[-1], so a harness can add rows to it.
+def demo_client(rows, tasks=1000, latency=0.0):
+    from benchmarks.datasets import downtime_rows, kpi_rows, productivity_rows
+
+    client = FakeClient(latency=latency)
+    client.add_dataframe("Project Management", "Downtime Issues", downtime_rows(rows))
+    client.add_dataframe("Project Management", "Personal Productivity", productivity_rows(tasks))
+    client.add_dataframe("Project Management", "KPI Dashboard", kpi_rows())
+    demo_clients[:] = [client]
+    return client
+
+
+demo_clients = []
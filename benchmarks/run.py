@@ -0,0 +1,268 @@
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics import downtime_report, downtime_statistics  # noqa: E402
+from benchmarks.datasets import downtime_rows, kpi_rows, productivity_rows  # noqa: E402
+from benchmarks.fake_gspread import FakeClient  # noqa: E402
+from keys import KeyIndex  # noqa: E402
+from priority import focus_split, priority_scores  # noqa: E402
+from charts import ChartCache, DEFAULT_PARETO_TOP_N, chart_key, pareto_spec  # noqa: E402
+from reliability import ReliabilityIndex  # noqa: E402
+from rollups import DowntimeRollup, pareto_series, pareto_top  # noqa: E402
+from schema import TypedDowntime  # noqa: E402
+from sheets import WorksheetCache  # noqa: E402
+from storage import SheetsBackend, filter_rows  # noqa: E402
+
+
+SHEET = "Project Management"
+DOWNTIME = "Downtime Issues"
+
+# Sections of streamlit_app.py that are timed, in the order a rerun executes them
+SECTIONS = ["load", "filter", "statistics", "pareto", "insights", "kpi", "productivity"]
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+APP = Path(__file__).resolve().parent.parent / "streamlit_app.py"
+
+# Views of the app, each run once per rerun by app_benchmark
+VIEWS = ["Downtime Issues", "KPI Dashboard", "Personal Productivity"]
+
+
+# Shared state of one "server process": the fake sheet, the backend and the
+# structures the app keeps in st.cache_resource
+class App:
+    def __init__(self, rows, latency, ttl, tasks):
+        self.client = FakeClient(latency=latency)
+        self.client.add_dataframe(SHEET, DOWNTIME, downtime_rows(rows))
+        self.client.add_dataframe(SHEET, "Personal Productivity", productivity_rows(tasks))
+        self.client.add_dataframe(SHEET, "KPI Dashboard", kpi_rows())
+        self.backend = SheetsBackend(self.client, WorksheetCache(ttl=ttl))
+        self.typed = TypedDowntime()
+        self.rollup = DowntimeRollup()
+        self.keys = KeyIndex("Key")
+        self.charts = ChartCache()
+        self.reliability = ReliabilityIndex()
+        self.appended = 0
+
+    # Simulate another tablet logging new issues between reruns
+    def append_downtime(self, count):
+        rows = downtime_rows(count, seed=1000 + self.appended)
+        self.client.spreadsheets[SHEET].worksheets[DOWNTIME].append_rows(rows.values.tolist())
+        self.appended += count
+
+
+# One rerun of the app's data path, section by section. This replays the
+# calls streamlit_app.py makes without Streamlit, so it stays fast at 1M rows;
+# app_benchmark (--app) runs the script itself to check it hasn't drifted.
+def rerun(app, start_date, end_date, open_only=False):
+    sections = {}
+
+    def load():
+        raw = app.backend.load(SHEET, DOWNTIME, incremental=True)
+        version = app.backend.version(SHEET, DOWNTIME)
+        edits = app.backend.edits(SHEET, DOWNTIME)
+        data = app.typed.sync(raw, version, edits)
+        app.rollup.sync(data, version, edits)
+        app.keys.sync(data, version, edits)
+        sections["data"] = data
+
+    def filter_():
+        sections["filtered"] = filter_rows(sections["data"], start_date, end_date, open_only)
+
+    def statistics():
+        return downtime_statistics(sections["filtered"])
+
+    def pareto():
+        series = pareto_top(pareto_series(app.rollup, "Downtime Reason", start_date, end_date, open_only=open_only),
+                            DEFAULT_PARETO_TOP_N)
+        return app.charts.get(chart_key(series, "vega"), lambda: pareto_spec(series))
+
+    def insights():
+        return downtime_report(sections["data"], start_date, end_date, open_only, filtered=sections["filtered"],
+                               rollup=app.rollup)
+
+    def kpi():
+        kpi_data = app.backend.load(SHEET, "KPI Dashboard")
+        totals = app.rollup.overall()
+        app.reliability.sync(sections["data"], app.backend.version(SHEET, DOWNTIME), app.backend.edits(SHEET, DOWNTIME))
+        as_of = app.reliability.last_day()
+        window_start = as_of - pd.Timedelta(days=29)
+        return (kpi_data.set_index("Date"), totals["minutes"], app.rollup.monthly()["minutes"],
+                app.reliability.overall(window_start, as_of), app.reliability.kpis("Process Name", window_start, as_of),
+                app.reliability.rolling("Process Name", 30))
+
+    def productivity():
+        tasks = app.backend.load(SHEET, "Personal Productivity").copy()
+        tasks["Due Date"] = pd.to_datetime(tasks["Due Date"], errors="coerce")
+        tasks["Days Until Due"] = (tasks["Due Date"] - pd.Timestamp(end_date)).dt.days
+        tasks["Priority Score"] = priority_scores(tasks["Priority"], tasks["Days Until Due"])
+        return focus_split(tasks, tasks["Priority Score"])
+
+    steps = {"load": load, "filter": filter_, "statistics": statistics, "pareto": pareto,
+             "insights": insights, "kpi": kpi, "productivity": productivity}
+    results = {}
+    for name in SECTIONS:
+        calls = sum(app.client.calls.values())
+        rows = sum(app.client.rows_transferred.values())
+        started = time.perf_counter()
+        steps[name]()
+        results[name] = {
+            "seconds": time.perf_counter() - started,
+            "api_calls": sum(app.client.calls.values()) - calls,
+            "rows_transferred": sum(app.client.rows_transferred.values()) - rows,
+        }
+    return results
+
+
+# Run `reruns` reruns against a sheet of `rows` downtime rows; the first is a
+# cold start, later ones see `appends` new rows each and a cache that is
+# expired when ttl is 0. With memory, the same sequence is replayed on a fresh
+# app under tracemalloc for the peak memory of each rerun (tracemalloc slows
+# everything down, so it is kept out of the timed pass).
+def benchmark(rows, reruns=3, latency=0.0, ttl=60, appends=10, tasks=1000, memory=True):
+    start_date = pd.Timestamp("2024-01-01")
+    end_date = pd.Timestamp("2025-01-01")
+
+    def replay(traced):
+        app = App(rows, latency, ttl, tasks)
+        for number in range(reruns):
+            if number and appends:
+                app.append_downtime(appends)
+            if traced:
+                tracemalloc.start()
+            started = time.perf_counter()
+            sections = rerun(app, start_date, end_date)
+            total = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if traced else None
+            if traced:
+                tracemalloc.stop()
+            yield number, sections, total, peak
+
+    records = []
+    peaks = [peak for _, _, _, peak in replay(True)] if memory else [None] * reruns
+    for (number, sections, total, _), peak in zip(replay(False), peaks):
+        for name, result in sections.items():
+            records.append({"rows": rows, "rerun": number, "section": name, **result})
+        records.append({"rows": rows, "rerun": number, "section": "total", "seconds": total,
+                        "api_calls": sum(r["api_calls"] for r in sections.values()),
+                        "rows_transferred": sum(r["rows_transferred"] for r in sections.values()),
+                        "peak_mb": peak / 2 ** 20 if peak is not None else None})
+    return records
+
+
+# Run streamlit_app.py itself under AppTest against a fake sheet of `rows`
+# downtime rows (the demo_rows setting), every view on every rerun, with
+# `appends` rows added by "other users" between reruns. Timings are the app's
+# own per-section ones (the Recorder behind its performance panel).
+def app_benchmark(rows, reruns=3, latency=0.0, ttl=60, appends=10, timeout=600):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.fake_gspread import demo_clients
+
+    st.cache_resource.clear()  # a fresh "server process" per size
+    with tempfile.TemporaryDirectory() as directory:
+        at = AppTest.from_file(str(APP), default_timeout=timeout)
+        at.secrets.update({"demo_rows": rows, "demo_latency": latency, "sheet_cache_ttl": ttl,
+                           "write_queue_path": str(Path(directory) / "write_queue.db"),
+                           "change_poll_interval": 0, "live_refresh_interval": 0})
+        records = []
+        for number in range(reruns):
+            if number and appends:
+                rows_added = downtime_rows(appends, seed=1000 + number)
+                demo_clients[-1].spreadsheets[SHEET].worksheets[DOWNTIME].append_rows(rows_added.values.tolist())
+            sections = []
+            for view in VIEWS:
+                if number or view != VIEWS[0]:
+                    at.radio(key="selected_view").set_value(view)
+                at.run()
+                if at.exception:
+                    raise RuntimeError(at.exception[0].value)
+                sections += at.session_state["reruns"][-1].sections
+            for section in sections:
+                records.append({"rows": rows, "rerun": number, "section": section["section"],
+                                "seconds": section["seconds"], "api_calls": section["api_calls"],
+                                "rows_transferred": section["rows"]})
+            records.append({"rows": rows, "rerun": number, "section": "total",
+                            "seconds": sum(section["seconds"] for section in sections),
+                            "api_calls": sum(section["api_calls"] for section in sections),
+                            "rows_transferred": sum(section["rows"] for section in sections), "peak_mb": None})
+    return records
+
+
+# Sections (rows, rerun, section) that got slower than the baseline by more
+# than `tolerance` (0.5 = 50%), ignoring anything under min_seconds
+def regressions(results, baseline, tolerance=0.5, min_seconds=0.01):
+    previous = {(r["rows"], r["rerun"], r["section"]): r for r in baseline}
+    slower = []
+    for result in results:
+        before = previous.get((result["rows"], result["rerun"], result["section"]))
+        if before is None or result["seconds"] < min_seconds:
+            continue
+        if result["seconds"] > before["seconds"] * (1 + tolerance) or result["api_calls"] > before["api_calls"]:
+            slower.append((result, before))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the downtime app against a fake Google Sheet.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Downtime Issues sizes to benchmark (default: 1k 10k 100k 1M)")
+    parser.add_argument("--reruns", type=int, default=3, help="Reruns per size; the first is a cold start")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per Sheets API call")
+    parser.add_argument("--ttl", type=float, default=60, help="Worksheet cache TTL (0 re-reads every rerun)")
+    parser.add_argument("--appends", type=int, default=10, help="Rows appended by 'other users' between reruns")
+    parser.add_argument("--tasks", type=int, default=1000, help="Personal Productivity rows")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (faster, no peak memory)")
+    parser.add_argument("--app", action="store_true",
+                        help="Run streamlit_app.py itself under AppTest (slower; no peak memory)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--csv", help="Write the results to this CSV file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed slowdown against the baseline before failing (default 0.5 = 50%%)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.rows:
+        if args.app:
+            results += app_benchmark(rows, reruns=args.reruns, latency=args.latency, ttl=args.ttl,
+                                     appends=args.appends)
+        else:
+            results += benchmark(rows, reruns=args.reruns, latency=args.latency, ttl=args.ttl,
+                                 appends=args.appends, tasks=args.tasks, memory=not args.no_memory)
+
+    table = pd.DataFrame(results)
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200):
+        print(table.pivot_table(index=["rows", "rerun"], columns="section", values="seconds", aggfunc="sum",
+                                sort=False)[list(dict.fromkeys(table["section"]))].round(4))
+        print()
+        print(table[table["section"] == "total"].drop(columns="section").to_string(index=False))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+
+    if args.baseline:
+        slower = regressions(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for result, before in slower:
+            print(f"REGRESSION {result['section']} rows={result['rows']} rerun={result['rerun']}: "
+                  f"{before['seconds']:.4f}s -> {result['seconds']:.4f}s, "
+                  f"{before['api_calls']} -> {result['api_calls']} API calls")
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Rows per page in the issue/task browsers
+DEFAULT_PAGE_SIZE = 50
+
+# Statuses listed after everything else (open issues and tasks come first)
+CLOSED_STATUSES = ("Closed", "Completed")
+
+
+def _text(column):
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column.dt.strftime("%Y-%m-%d").fillna("")
+    return column.astype(object).where(column.notna(), "").astype(str)
+
+
+# Rows with text in any of the columns (case-insensitive). Categorical
+# columns are matched on their categories, not row by row.
+def search_rows(data, text, columns):
+    text = (text or "").strip()
+    if not text or data.empty:
+        return data
+    mask = np.zeros(len(data), dtype=bool)
+    for column in columns:
+        if column not in data.columns:
+            continue
+        values = data[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            found = values.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+            mask |= np.isin(values.cat.codes.to_numpy(), np.flatnonzero(found))
+        else:
+            mask |= _text(values).str.contains(text, case=False, regex=False).to_numpy()
+    return data[mask]
+
+
+# Open rows first, then closed ones; most recently added first within each
+def open_first(data, status_column="Status", closed_statuses=CLOSED_STATUSES):
+    if data.empty:
+        return data
+    closed = data[status_column].isin(closed_statuses).to_numpy() if status_column in data.columns \
+        else np.zeros(len(data), dtype=bool)
+    return data.iloc[np.lexsort((-np.arange(len(data)), closed))]
+
+
+def page_count(rows, page_size=DEFAULT_PAGE_SIZE):
+    return max(1, math.ceil(rows / page_size))
+
+
+# Rows of one page (1-based)
+def page_rows(data, page, page_size=DEFAULT_PAGE_SIZE):
+    first = (page - 1) * page_size
+    return data.iloc[first:first + page_size]
+
+
+# "value - value - ..." labels for rows, built a column at a time
+def row_labels(data, columns, sep=" - "):
+    labels = pd.Series("", index=data.index)
+    for position, column in enumerate(columns):
+        text = _text(data[column]) if column in data.columns else pd.Series("", index=data.index)
+        labels = text if position == 0 else labels + sep + text
+    return labels
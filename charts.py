@@ -0,0 +1,114 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# Most rendered charts kept in memory (least recently used ones are dropped)
+DEFAULT_CHART_CACHE_SIZE = 64
+
+# Downtime reasons shown on the Pareto chart before the rest become "Other"
+DEFAULT_PARETO_TOP_N = 15
+
+
+# Key of a chart: a hash of the series it plots plus anything else that
+# changes the picture (renderer, title, ...)
+def chart_key(series, *params):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(series, index=True).to_numpy().tobytes())
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+
+# Rendered charts shared by every session, so a rerun with the same data
+# reuses the chart instead of drawing it again. Bounded: once max_entries
+# charts are cached, the least recently used one is evicted.
+class ChartCache:
+    def __init__(self, max_entries=DEFAULT_CHART_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._charts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._charts:
+                self._charts.move_to_end(key)
+                self.hits += 1
+                return self._charts[key]
+            self.misses += 1
+        chart = build()
+        with self._lock:
+            self._charts[key] = chart
+            self._charts.move_to_end(key)
+            while len(self._charts) > self.max_entries:
+                self._charts.popitem(last=False)
+                self.evictions += 1
+        return chart
+
+    def stats(self):
+        with self._lock:
+            return {"charts": len(self._charts), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+# Bars and cumulative percentage of a Pareto series (already in display order)
+def pareto_frame(series):
+    return pd.DataFrame({
+        "label": series.index.astype(str),
+        "value": series.to_numpy(dtype=float),
+        "cumulative": (series.cumsum() / series.sum() * 100).to_numpy(dtype=float),
+    })
+
+
+# Vega-Lite spec of a Pareto chart (bars plus a cumulative % line on a second
+# axis), drawn by the browser with st.vega_lite_chart
+def pareto_spec(series, title="Pareto Chart", value_title="Total Downtime (Minutes)"):
+    x = {"field": "label", "type": "nominal", "sort": None, "title": None, "axis": {"labelAngle": -45}}
+    return {
+        "title": title,
+        "data": {"values": pareto_frame(series).to_dict("records")},
+        "layer": [
+            {"mark": {"type": "bar", "opacity": 0.6},
+             "encoding": {"x": x, "y": {"field": "value", "type": "quantitative", "title": value_title},
+                          "tooltip": [{"field": "label", "title": "Reason"},
+                                      {"field": "value", "title": value_title, "format": ",.0f"}]}},
+            {"mark": {"type": "line", "color": "red", "point": {"color": "red"}},
+             "encoding": {"x": x,
+                          "y": {"field": "cumulative", "type": "quantitative", "title": "Cumulative Percentage (%)",
+                                "scale": {"domain": [0, 110]}, "axis": {"orient": "right"}},
+                          "tooltip": [{"field": "label", "title": "Reason"},
+                                      {"field": "cumulative", "title": "Cumulative %", "format": ".1f"}]}},
+        ],
+        "resolve": {"scale": {"y": "independent"}},
+    }
+
+
+# The same chart as a PNG drawn with matplotlib (pareto_renderer = "matplotlib").
+# Uses a standalone Figure rather than pyplot, so no figure is left registered
+# (and growing memory) after each render.
+def pareto_png(series, title="Pareto Chart", value_title="Total Downtime (Minutes)"):
+    from matplotlib.figure import Figure
+
+    frame = pareto_frame(series)
+    positions = range(len(frame))
+    fig = Figure(figsize=(10, 5))
+    ax1 = fig.subplots()
+    ax1.bar(positions, frame["value"], alpha=0.6, label=value_title)
+    ax1.set_ylabel(value_title)
+    ax1.set_xticks(list(positions))
+    ax1.set_xticklabels(frame["label"], rotation=45, ha="right")
+
+    ax2 = ax1.twinx()
+    ax2.plot(positions, frame["cumulative"], marker="o", linestyle="-", color="red", label="Cumulative %")
+    ax2.set_ylabel("Cumulative Percentage (%)")
+    ax2.set_ylim(0, 110)
+
+    ax1.set_title(title)
+    fig.tight_layout()
+    output = io.BytesIO()
+    fig.savefig(output, format="png", dpi=100)
+    return output.getvalue()
@@ -0,0 +1,276 @@
+import numpy as np
+import pandas as pd
+
+from keys import key_texts, new_key
+from schema import MINUTES_COLUMN
+
+
+# Rows read from the CSV at a time (memory use depends on this, not on file size)
+DEFAULT_CHUNK_SIZE = 5000
+
+# Rejected rows kept (with their reason) to show after an import
+MAX_REJECTED_SAMPLES = 100
+
+# Column layout of "Downtime Issues", in sheet order
+IMPORT_COLUMNS = ["Key", "Date", "Time", "Process Name", "Downtime Reason", "Action Taken", "Root Cause",
+                  MINUTES_COLUMN, "Resolved (Y/N)", "Status", "Resolution Time"]
+
+# Columns an imported row must have a value in
+REQUIRED_COLUMNS = ["Date", "Process Name", "Downtime Reason"]
+
+# Other names MES/PLC exports use for the sheet's columns (matched ignoring case,
+# spaces, underscores and punctuation)
+COLUMN_ALIASES = {
+    "Key": ["key", "id", "eventid", "event", "stopid", "stoppageid"],
+    "Date": ["date", "startdate", "eventdate"],
+    "Time": ["time", "starttime", "eventtime"],
+    "Timestamp": ["timestamp", "start", "startedat", "datetime", "eventstart", "starttimestamp"],
+    "Process Name": ["processname", "process", "line", "machine", "asset", "workcenter", "equipment"],
+    "Downtime Reason": ["downtimereason", "reason", "stopreason", "reasoncode", "fault", "faultdescription"],
+    "Action Taken": ["actiontaken", "action", "correctiveaction"],
+    "Root Cause": ["rootcause", "cause"],
+    MINUTES_COLUMN: ["timetoresolveminutes", "timetoresolve", "minutes", "duration", "durationminutes",
+                     "downtimeminutes", "durationmin"],
+    "Resolved (Y/N)": ["resolvedyn", "resolved"],
+    "Status": ["status", "state"],
+    "Resolution Time": ["resolutiontime", "end", "endtime", "resolvedat"],
+}
+
+# Columns that identify the same event when the export has no Key of its own
+FINGERPRINT_COLUMNS = ["Date", "Time", "Process Name", "Downtime Reason"]
+
+# Prefix of keys made from export IDs, so they never clash with the sheet's
+# own keys (older rows are numbered 1, 2, 3...) - only with earlier imports
+EXPORT_KEY_PREFIX = "x-"
+
+# Sorted hash arrays kept before they are merged into one (see _HashSet)
+MAX_HASH_PARTS = 8
+
+
+def _simplify(name):
+    return "".join(ch for ch in str(name).lower() if ch.isalnum())
+
+
+# Export column -> sheet column, for the columns that can be recognized
+def map_columns(columns):
+    lookup = {alias: target for target, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    mapping = {}
+    for column in columns:
+        target = lookup.get(_simplify(column))
+        if target is not None and target not in mapping.values():
+            mapping[column] = target
+    return mapping
+
+
+# Dates/timestamps in ISO form are parsed in one go; anything else (e.g.
+# 05/01/2024) is parsed value by value
+def _datetimes(values):
+    parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    retry = parsed.isna() & values.notna() & (values != "")
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], format="mixed", errors="coerce")
+    return parsed
+
+
+def _clock(values):
+    parsed = pd.to_datetime(values, format="%H:%M:%S", errors="coerce")
+    parsed = parsed.fillna(pd.to_datetime(values, format="%H:%M", errors="coerce"))
+    return parsed.dt.strftime("%H:%M:%S")
+
+
+# One chunk of raw export rows -> (rows in the sheet's layout, rejected rows
+# with a "Reason" column). Values are cleaned the way the entry form writes
+# them: ISO Date, HH:MM:SS Time, whole minutes, Y/N and a Status that follows
+# Resolved, and a Resolution Time for resolved events.
+def normalize_chunk(chunk, mapping):
+    raw = chunk.rename(columns=mapping)
+    raw = raw.loc[:, ~raw.columns.duplicated()]
+    rows = pd.DataFrame(index=raw.index)
+    for column in IMPORT_COLUMNS:
+        rows[column] = raw[column].astype(str).str.strip() if column in raw.columns else ""
+
+    timestamps = _datetimes(raw["Timestamp"]) if "Timestamp" in raw.columns else pd.Series(pd.NaT, index=raw.index)
+    dates = _datetimes(rows["Date"].where(rows["Date"] != "")).fillna(timestamps.dt.normalize())
+    times = _clock(rows["Time"]).fillna(timestamps.dt.strftime("%H:%M:%S")).fillna("")
+    minutes = pd.to_numeric(rows[MINUTES_COLUMN].where(rows[MINUTES_COLUMN] != ""), errors="coerce")
+
+    resolved = rows["Resolved (Y/N)"].str.upper().str[:1].map({"Y": "Y", "T": "Y", "1": "Y", "N": "N", "F": "N",
+                                                                "0": "N"})
+    status = rows["Status"].str.title().where(rows["Status"].str.title().isin(["Open", "In Progress", "Closed"]))
+    resolved = resolved.fillna(status.eq("Closed").map({True: "Y", False: "N"}))
+    status = status.fillna(resolved.map({"Y": "Closed", "N": "Open"}))
+
+    started = dates + pd.to_timedelta(times.where(times != "", "00:00:00"))
+    resolution = rows["Resolution Time"].where(
+        rows["Resolution Time"] != "",
+        (started + pd.to_timedelta(minutes.fillna(0), unit="m")).dt.strftime("%Y-%m-%d %H:%M:%S").where(status == "Closed"),
+    ).fillna("")
+
+    reasons = pd.Series("", index=rows.index)
+    for column in REQUIRED_COLUMNS[1:]:
+        reasons = reasons.where(reasons != "", np.where(rows[column] == "", f"missing {column}", ""))
+    reasons = reasons.where(reasons != "", np.where(dates.isna(), "missing or invalid Date", ""))
+    reasons = reasons.where(reasons != "", np.where(minutes.lt(0), "negative Time to Resolve", ""))
+    reasons = reasons.where(
+        reasons != "",
+        np.where(rows[MINUTES_COLUMN].ne("") & minutes.isna(), "invalid Time to Resolve", ""),
+    )
+
+    rows["Key"] = export_keys(key_texts(rows["Key"]))
+    rows["Date"] = dates.dt.strftime("%Y-%m-%d")
+    rows["Time"] = times
+    rows[MINUTES_COLUMN] = minutes.round().astype("Int64").astype(str).replace("<NA>", "")
+    rows["Resolved (Y/N)"] = resolved
+    rows["Status"] = status
+    rows["Resolution Time"] = resolution
+
+    valid = (reasons == "").to_numpy()
+    rejected = chunk[~valid].assign(Reason=reasons[~valid].to_numpy())
+    return rows[valid], rejected
+
+
+# Hashes of the FINGERPRINT_COLUMNS of rows (raw, typed or imported alike)
+def fingerprints(data):
+    if data.empty:
+        return np.array([], dtype=np.uint64)
+    frame = pd.DataFrame(index=data.index)
+    for column in FINGERPRINT_COLUMNS:
+        values = data[column] if column in data.columns else pd.Series("", index=data.index)
+        if column == "Date":
+            values = pd.to_datetime(values, errors="coerce").dt.strftime("%Y-%m-%d")
+        elif column == "Time":
+            text = values.astype(object).where(values.notna(), "").astype(str)
+            values = _clock(text).fillna(text)
+        frame[column] = values.astype(object).where(values.notna(), "").astype(str).str.strip()
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+# Keys of an export's IDs (EXPORT_KEY_PREFIX added; blank IDs stay blank)
+def export_keys(ids):
+    prefixed = ids.str.startswith(EXPORT_KEY_PREFIX)
+    return ids.where((ids == "") | prefixed, EXPORT_KEY_PREFIX + ids)
+
+
+def _key_hashes(keys):
+    return pd.util.hash_array(np.asarray(keys, dtype=object))
+
+
+# Set of 64-bit hashes held in a few sorted numpy arrays (8 bytes a row
+# instead of a Python int in a set), so what an import remembers of the sheet
+# and of the rows it has seen stays small however many rows go through it
+class _HashSet:
+    def __init__(self, hashes=()):
+        self.parts = []
+        self.add(hashes)
+
+    def add(self, hashes):
+        hashes = np.unique(np.asarray(hashes, dtype=np.uint64))
+        if len(hashes):
+            self.parts.append(hashes)
+        if len(self.parts) > MAX_HASH_PARTS:
+            self.parts = [np.unique(np.concatenate(self.parts))]
+
+    # Membership of every hash, as a boolean array
+    def contains(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        found = np.zeros(len(hashes), dtype=bool)
+        for part in self.parts:
+            positions = np.minimum(np.searchsorted(part, hashes), len(part) - 1)
+            found |= part[positions] == hashes
+        return found
+
+
+# count new keys, unused in the sheet and in this import so far
+def _new_keys(count, existing_keys, seen_keys):
+    keys = pd.Series([], dtype=object)
+    while len(keys) < count:
+        batch = pd.Series([new_key(existing_keys) for _ in range(count - len(keys))], dtype=object)
+        keys = pd.concat([keys, batch[~seen_keys.contains(_key_hashes(batch))]], ignore_index=True).drop_duplicates()
+    seen_keys.add(_key_hashes(keys))
+    return keys.tolist()
+
+
+# Outcome of an import (updated as chunks are processed)
+class ImportResult:
+    def __init__(self):
+        self.rows_read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.rejected_samples = []
+        self.unmapped_columns = []
+
+    def rejected_frame(self):
+        return pd.concat(self.rejected_samples, ignore_index=True) if self.rejected_samples else pd.DataFrame()
+
+    def to_dict(self):
+        return {"rows_read": self.rows_read, "imported": self.imported, "duplicates": self.duplicates,
+                "rejected": self.rejected}
+
+
+# Stream a CSV export into "Downtime Issues". The file is read chunksize rows
+# at a time; each chunk is validated and normalized, given keys (export IDs
+# are kept under EXPORT_KEY_PREFIX, other rows get new random keys), stripped
+# of rows already in the sheet, still queued or earlier in the file, and
+# handed to write(rows) - e.g. the write queue, which sends it with batched
+# append_rows calls. existing is the current sheet data and existing_keys its
+# keys (anything supporting "in"); queued is an iterable of frames of rows
+# waiting to be written (see WriteQueue.queued_rows).
+# progress(fraction, result) is called after every chunk.
+def import_downtime(source, write, existing=None, existing_keys=(), queued=(), chunksize=DEFAULT_CHUNK_SIZE,
+                    progress=None, total_bytes=None):
+    result = ImportResult()
+    seen = _HashSet(fingerprints(existing) if existing is not None else ())
+    seen_keys = _HashSet()
+    for rows in queued:
+        seen.add(fingerprints(rows))
+        if "Key" in rows.columns:
+            seen_keys.add(_key_hashes(key_texts(rows["Key"])))
+
+    reader = pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False, skipinitialspace=True)
+    mapping = None
+    for chunk in reader:
+        if mapping is None:
+            mapping = map_columns(chunk.columns)
+            result.unmapped_columns = [c for c in chunk.columns if c not in mapping]
+            missing = [c for c in REQUIRED_COLUMNS if c not in mapping.values()
+                       and not (c == "Date" and "Timestamp" in mapping.values())]
+            if missing:
+                raise ValueError(f"Required column(s) not found in the file: {', '.join(missing)}")
+        result.rows_read += len(chunk)
+
+        rows, rejected = normalize_chunk(chunk, mapping)
+        if len(rejected):
+            result.rejected += len(rejected)
+            kept = sum(len(sample) for sample in result.rejected_samples)
+            if kept < MAX_REJECTED_SAMPLES:
+                result.rejected_samples.append(rejected.head(MAX_REJECTED_SAMPLES - kept))
+
+        # Drop events already in the sheet (still queued, or earlier in this file), by key
+        # when the export has one, otherwise by date, time, process and reason
+        hashes = fingerprints(rows)
+        keys = rows["Key"]
+        keyed = (keys != "").to_numpy()
+        duplicate = seen.contains(hashes) | pd.Series(hashes).duplicated().to_numpy()
+        if keyed.any():
+            key_hashes = _key_hashes(keys[keyed])
+            known = np.array([key in existing_keys for key in keys[keyed]], dtype=bool) \
+                | seen_keys.contains(key_hashes)
+            duplicate[keyed] = known | keys[keyed].duplicated().to_numpy()
+            seen_keys.add(key_hashes[~duplicate[keyed]])
+        result.duplicates += int(duplicate.sum())
+        rows = rows[~duplicate].copy()
+        seen.add(hashes[~duplicate])
+
+        unkeyed = (rows["Key"] == "").to_numpy()
+        if unkeyed.any():
+            rows.loc[unkeyed, "Key"] = _new_keys(int(unkeyed.sum()), existing_keys, seen_keys)
+        if len(rows):
+            write(rows)
+            result.imported += len(rows)
+
+        if progress is not None:
+            position = source.tell() if hasattr(source, "tell") else None
+            fraction = min(1.0, position / total_bytes) if position is not None and total_bytes else None
+            progress(fraction, result)
+    return result
@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+
+
+# Reruns kept per session for the debug panel and exports
+DEFAULT_HISTORY = 20
+
+# The recorder of the rerun running on this thread (Streamlit runs each
+# session's script on its own thread); calls made elsewhere, e.g. by the
+# write queue or the mirror sync threads, are only counted in the totals.
+_active = threading.local()
+
+
+def activate(recorder):
+    _active.recorder = recorder
+
+
+def active_recorder():
+    return getattr(_active, "recorder", None)
+
+
+# Rows moved by one gspread call, from its arguments or its result
+def _rows_transferred(method, args, kwargs, result):
+    if method in ("get_all_records", "get_all_values", "get"):
+        return len(result or [])
+    if method == "batch_get":
+        return sum(len(values or []) for values in result or [])
+    if method == "append_rows":
+        return len(args[0] if args else kwargs.get("values", []))
+    if method == "batch_update":
+        return len(args[0] if args else kwargs.get("data", []))
+    if method in ("row_values", "col_values", "cell", "update_cell", "update", "append_row"):
+        return 1
+    if method == "find":
+        return 1 if result is not None else 0
+    return 0
+
+
+# Timings of one rerun: the sections of the script it went through and every
+# gspread call made while it ran
+class Recorder:
+    def __init__(self, rerun=0):
+        self.rerun = rerun
+        self.started = datetime.now()
+        self.seconds = None
+        self.calls = []
+        self.sections = []
+        self._section = None
+        self._clock = time.perf_counter()
+
+    def record_call(self, method, seconds, rows, error=None):
+        self.calls.append({"method": method, "seconds": seconds, "rows": rows, "error": error})
+
+    # Start timing a section of the script; the previous section (if any)
+    # ends here. The script is marked top to bottom, so each section covers
+    # everything up to the next mark.
+    def begin(self, name):
+        self._end_section()
+        self._section = (name, time.perf_counter(), len(self.calls))
+
+    def _end_section(self):
+        if self._section is None:
+            return
+        name, started, first_call = self._section
+        calls = self.calls[first_call:]
+        self.sections.append({
+            "section": name,
+            "seconds": time.perf_counter() - started,
+            "api_calls": len(calls),
+            "api_seconds": sum(call["seconds"] for call in calls),
+            "rows": sum(call["rows"] for call in calls),
+        })
+        self._section = None
+
+    def finish(self):
+        self._end_section()
+        self.seconds = time.perf_counter() - self._clock
+
+    # Per-section timings (sections in the order they ran)
+    def sections_frame(self):
+        return pd.DataFrame(self.sections, columns=["section", "seconds", "api_calls", "api_seconds", "rows"])
+
+    # Calls, latency and rows per gspread method
+    def calls_frame(self):
+        calls = pd.DataFrame(self.calls, columns=["method", "seconds", "rows", "error"])
+        return calls.groupby("method").agg(calls=("seconds", "size"), seconds=("seconds", "sum"),
+                                           max_seconds=("seconds", "max"), rows=("rows", "sum"),
+                                           errors=("error", "count")).reset_index()
+
+    def to_dict(self):
+        return {
+            "rerun": self.rerun,
+            "started": self.started.isoformat(timespec="seconds"),
+            "seconds": self.seconds,
+            "sections": self.sections,
+            "api_calls": self.calls_frame().to_dict("records"),
+        }
+
+
+# Reruns as JSON, for monitoring
+def export_json(recorders):
+    return json.dumps([recorder.to_dict() for recorder in recorders], indent=2, default=str)
+
+
+# Reruns as CSV, one line per section plus one per rerun ("total")
+def export_csv(recorders):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, ["rerun", "started", "section", "seconds", "api_calls", "api_seconds", "rows"])
+    writer.writeheader()
+    for recorder in recorders:
+        common = {"rerun": recorder.rerun, "started": recorder.started.isoformat(timespec="seconds")}
+        for section in recorder.sections:
+            writer.writerow({**common, **section})
+        writer.writerow({**common, "section": "total", "seconds": recorder.seconds,
+                         "api_calls": len(recorder.calls),
+                         "api_seconds": sum(call["seconds"] for call in recorder.calls),
+                         "rows": sum(call["rows"] for call in recorder.calls)})
+    return output.getvalue()
+
+
+# Process-wide totals per gspread method, across all sessions and threads
+class ApiTotals:
+    def __init__(self):
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.rows = Counter()
+        self.errors = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, method, seconds, rows, error=None):
+        with self._lock:
+            self.calls[method] += 1
+            self.seconds[method] += seconds
+            self.rows[method] += rows
+            if error is not None:
+                self.errors[method] += 1
+
+    def frame(self):
+        with self._lock:
+            return pd.DataFrame({"calls": self.calls, "seconds": self.seconds, "rows": self.rows,
+                                 "errors": self.errors}).fillna(0).astype({"errors": int}).rename_axis("method").reset_index()
+
+
+# Wraps a gspread client (and the spreadsheets and worksheets opened through
+# it) so every API call is timed and counted: in the totals, and in the
+# recorder of the rerun that made it. Everything else passes through.
+class _Instrumented:
+    # Methods whose result is wrapped as well, e.g. {"worksheet": InstrumentedWorksheet}
+    wraps = {}
+
+    def __init__(self, target, totals):
+        self._target = target
+        self._totals = totals
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            error = None
+            result = None
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                seconds = time.perf_counter() - started
+                rows = _rows_transferred(name, args, kwargs, result) if error is None else 0
+                self._totals.add(name, seconds, rows, error)
+                recorder = active_recorder()
+                if recorder is not None:
+                    recorder.record_call(name, seconds, rows, error)
+            wrapper = self.wraps.get(name)
+            return wrapper(result, self._totals) if wrapper is not None and result is not None else result
+        return call
+
+
+class InstrumentedWorksheet(_Instrumented):
+    pass
+
+
+class InstrumentedSpreadsheet(_Instrumented):
+    wraps = {"worksheet": InstrumentedWorksheet, "get_worksheet": InstrumentedWorksheet,
+             "add_worksheet": InstrumentedWorksheet}
+
+
+class InstrumentedClient(_Instrumented):
+    wraps = {"open": InstrumentedSpreadsheet, "open_by_key": InstrumentedSpreadsheet,
+             "open_by_url": InstrumentedSpreadsheet, "create": InstrumentedSpreadsheet}
+
+    def __init__(self, client, totals=None):
+        super().__init__(client, totals if totals is not None else ApiTotals())
+
+    @property
+    def totals(self):
+        return self._totals
@@ -0,0 +1,87 @@
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+# Length of generated keys (hex digits of a random UUID, 48 bits)
+KEY_LENGTH = 12
+
+
+# Canonical text form of a key cell: 5, 5.0 and "5" are all "5", blanks are ""
+def key_text(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)) or value is pd.NA:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+# key_text for a whole column at once
+def key_texts(keys):
+    numeric = pd.to_numeric(keys, errors="coerce")
+    whole = np.isfinite(numeric) & (numeric == numeric.round())
+    text = keys.astype(object).where(keys.notna(), "").astype(str).str.strip()
+    small = whole & (numeric.abs() < 2 ** 63)
+    text[small] = numeric[small].astype("int64").astype(str)
+    text[whole & ~small] = numeric[whole & ~small].map(lambda value: str(int(value)))
+    return text
+
+
+# New random key that no other tablet/session will generate, retried on the
+# (very unlikely) chance it is already in use. Keys always start with a
+# letter other than "e", so Sheets and get_all_records() never read one back
+# as a number ("000123..." or "12e456..." would lose their digits).
+def new_key(existing=()):
+    while True:
+        key = uuid.uuid4().hex[:KEY_LENGTH]
+        if key[0] in "abcdf" and key not in existing:
+            return key
+
+
+# Key -> sheet row number (2 for the first data row) for a worksheet, so
+# updates go straight to their row without find() calls or scans. Kept in
+# step the same way as the rollups: appended rows are added to the index,
+# edits to other columns leave it as is, anything else (an edited key, a
+# reload, deleted or moved rows) rebuilds it.
+class KeyIndex:
+    def __init__(self, key_column="Key"):
+        self.key_column = key_column
+        self.rows = {}
+        self.duplicates = set()
+        self.count = 0
+        self.edited = 0
+        self.version = None
+        self._lock = threading.Lock()
+
+    def sync(self, data, version=None, edits=()):
+        with self._lock:
+            key_edited = len(edits) < self.edited or any(column == self.key_column
+                                                          for _, column in edits[self.edited:])
+            if version != self.version or len(data) < self.count or key_edited:
+                self.rows = {}
+                self.duplicates = set()
+                self.count = 0
+            if len(data) > self.count:
+                self._add(data.iloc[self.count:])
+            self.edited = len(edits)
+            self.version = version
+
+    def _add(self, rows):
+        keys = key_texts(rows[self.key_column]) if self.key_column in rows.columns else pd.Series("", index=rows.index)
+        sheet_rows = pd.Series(range(self.count + 2, self.count + 2 + len(rows)), index=keys.to_numpy())
+        sheet_rows = sheet_rows[sheet_rows.index != ""]
+        self.duplicates.update(sheet_rows.index[sheet_rows.index.duplicated()])
+        self.duplicates.update(self.rows.keys() & set(sheet_rows.index))
+        self.rows.update(zip(sheet_rows.index, sheet_rows.tolist()))
+        self.count += len(rows)
+
+    # Sheet row holding key (the last one if the key is duplicated), or None
+    def row(self, key):
+        with self._lock:
+            return self.rows.get(key_text(key))
+
+    def __contains__(self, key):
+        with self._lock:
+            return key_text(key) in self.rows
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+
+# Score for each Priority value; anything else (Low, blank) gets DEFAULT_PRIORITY_WEIGHT
+PRIORITY_WEIGHTS = {"High": 3, "Medium": 2}
+DEFAULT_PRIORITY_WEIGHT = 1
+
+# (days until due, score) pairs, checked in order: a task due within 3 days
+# scores 3, within 7 days 2, within 14 days 1, later (or no due date) 0
+DUE_DATE_THRESHOLDS = [(3, 3), (7, 2), (14, 1)]
+
+# Share of all tasks that makes up the focus list (the "20" in 80/20)
+FOCUS_SHARE = 0.2
+
+# Only tasks in these statuses can be on the focus list
+FOCUS_STATUSES = ("Open", "In Progress")
+
+
+# Priority Score for every task at once: priority weight + due-date score
+def priority_scores(priority, days_until_due, weights=None, default_weight=DEFAULT_PRIORITY_WEIGHT,
+                    thresholds=None):
+    weights = PRIORITY_WEIGHTS if weights is None else weights
+    thresholds = DUE_DATE_THRESHOLDS if thresholds is None else thresholds
+
+    priority = pd.Series(priority)
+    base = priority.map(dict(weights)).fillna(default_weight).to_numpy(dtype=float)
+
+    days = pd.to_numeric(pd.Series(days_until_due), errors="coerce").to_numpy(dtype=float)
+    due = np.select([days <= limit for limit, _ in thresholds], [score for _, score in thresholds], default=0)
+    scores = base + due
+    return scores.astype(int) if np.all(scores == np.round(scores)) else scores
+
+
+# Positions of the k highest scores, best first (ties keep their original order).
+# Uses a partial selection, so only the k selected values are ever sorted.
+def top_k(scores, k):
+    scores = np.asarray(scores)
+    k = max(0, min(int(k), len(scores)))
+    if k == 0:
+        return np.array([], dtype=int)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        # argpartition splits ties at the k-th score arbitrarily; take the tied
+        # tasks in their original order instead
+        kth = scores[candidates].min()
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+# Split tasks into the focus list (best-scoring open tasks, focus_share of all
+# tasks) and the low-value list (the lowest-scoring 1 - focus_share of all
+# tasks), both ordered by descending score.
+def focus_split(tasks, scores, focus_share=FOCUS_SHARE, focus_statuses=FOCUS_STATUSES):
+    scores = np.asarray(scores)
+    total = len(tasks)
+
+    eligible = np.flatnonzero(tasks["Status"].isin(focus_statuses).to_numpy())
+    focus = eligible[top_k(scores[eligible], int(total * focus_share))]
+
+    low_count = int(total * (1 - focus_share))
+    low = top_k(-scores, low_count)[::-1] if low_count else np.array([], dtype=int)
+    return tasks.iloc[focus], tasks.iloc[low]
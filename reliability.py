@@ -0,0 +1,257 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from schema import MINUTES_COLUMN, edited_rows
+
+
+# Columns reliability KPIs are broken down by
+RELIABILITY_DIMENSIONS = ["Process Name", "Downtime Reason"]
+
+# Rolling windows (days) offered on the KPI Dashboard
+DEFAULT_WINDOWS = (7, 30)
+
+# Scheduled operating time per day and process (24h = calendar time)
+DEFAULT_OPERATING_HOURS = 24
+
+# Per-day measures kept for every value of a dimension:
+#   count   - downtime events (failures)
+#   timed   - events with a numeric Time to Resolve (for MTTR)
+#   minutes - total Time to Resolve (Minutes)
+RELIABILITY_MEASURES = ["count", "timed", "minutes"]
+
+
+# Day offsets (from first_day), dimension codes and measures of typed
+# downtime rows, all as numpy arrays. Rows without a valid Date are dropped.
+def _event_arrays(data):
+    days = pd.to_datetime(data["Date"], errors="coerce").to_numpy().astype("datetime64[D]") \
+        if "Date" in data.columns else np.full(len(data), np.datetime64("NaT"), dtype="datetime64[D]")
+    minutes = pd.to_numeric(data[MINUTES_COLUMN], errors="coerce").to_numpy(dtype=float) \
+        if MINUTES_COLUMN in data.columns else np.full(len(data), np.nan)
+    valid = ~np.isnat(days)
+    return valid, days[valid], minutes[valid]
+
+
+# Labels of a column as (codes, unique labels), without going through Python
+# objects row by row when the column is already categorical
+def _factorize(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        labels = column.cat.categories.astype(str)
+        codes = column.cat.codes.to_numpy().astype(np.int64)
+        if (codes < 0).any():
+            labels = labels.append(pd.Index([""]))
+            codes = np.where(codes < 0, len(labels) - 1, codes)
+        return codes, labels
+    codes, labels = pd.factorize(column.astype(object).where(column.notna(), "").astype(str))
+    return codes.astype(np.int64), pd.Index(labels, dtype=object)
+
+
+# Cells (day, value code) of events with their summed measures, in a few
+# parts sorted by day: appended rows (and edited rows, taken out with negative
+# measures) go in a new part, and the parts are merged into one, dropping
+# cells with no events left, once there are more than this many
+MAX_CELL_PARTS = 8
+
+
+# Sum the measures of equal (day, code) cells, sorted by day and code, and
+# drop the ones left without events
+def _merge_cells(parts):
+    days = np.concatenate([part[0] for part in parts])
+    codes = np.concatenate([part[1] for part in parts])
+    measures = np.concatenate([part[2] for part in parts])
+    if not len(days):
+        return days, codes, measures
+    order = np.lexsort((codes, days))
+    days, codes, measures = days[order], codes[order], measures[order]
+    starts = np.flatnonzero(np.r_[True, (days[1:] != days[:-1]) | (codes[1:] != codes[:-1])])
+    measures = np.add.reduceat(measures, starts, axis=0)
+    kept = measures[:, 0] != 0
+    return days[starts][kept], codes[starts][kept], measures[kept]
+
+
+# MTTR, MTBF, availability and rolling downtime per Process Name and per
+# Downtime Reason. Events are summed per day and value into sparse cells kept
+# sorted by day, so memory follows the number of (day, value) pairs with
+# events rather than days x values, and a date range is two binary searches
+# per part whatever the number of events. Built once from the typed rows, then
+# kept current by adding only appended (and edited) rows, like DowntimeRollup.
+class ReliabilityIndex:
+    def __init__(self, dimensions=RELIABILITY_DIMENSIONS, operating_hours=DEFAULT_OPERATING_HOURS):
+        self.dimensions = list(dimensions)
+        self.operating_minutes = operating_hours * 60
+        self._lock = threading.Lock()
+        self.version = None
+        self._reset()
+
+    def _reset(self):
+        self.rows = 0
+        self.edited = 0
+        self._data = None
+        self.undated = 0
+        self.first_day = None
+        self.days = 0
+        self.values = {dimension: pd.Index([], dtype=object) for dimension in self.dimensions}
+        self._cells = {dimension: [] for dimension in self.dimensions}
+
+    # Bring the index up to date with the full set of typed rows. version
+    # identifies the non-append state of the source (see the storage backends'
+    # version()); when it is unchanged only rows beyond the ones already
+    # counted are added, and rows with cells edited since (edits) are taken
+    # out as they were in the last data synced and counted again.
+    def sync(self, data, version=None, edits=()):
+        with self._lock:
+            if version != self.version or len(data) < self.rows or len(edits) < self.edited:
+                self._reset()
+            elif len(edits) > self.edited and self._data is not None:
+                positions, _ = edited_rows(edits[self.edited:], self.rows)
+                if positions:
+                    self._add(self._data.iloc[positions], sign=-1)
+                    self._add(data.iloc[positions])
+            if len(data) > self.rows:
+                self._add(data.iloc[self.rows:])
+                self.rows = len(data)
+            self.edited = len(edits)
+            self.version = version
+            self._data = data
+
+    # Count newly appended rows
+    def add(self, rows):
+        with self._lock:
+            self._add(rows)
+            self.rows += len(rows)
+
+    # Add events to the day cells (sign=-1 takes them out)
+    def _add(self, rows, sign=1):
+        valid, days, minutes = _event_arrays(rows)
+        self.undated += sign * int((~valid).sum())
+        if not len(days):
+            return
+        first = days.min() if self.first_day is None else min(self.first_day, days.min())
+        last = max(self.first_day + self.days - 1, days.max()) if self.days else days.max()
+        self.first_day, self.days = first, int((last - first).astype(np.int64)) + 1
+        days = days.astype(np.int64)
+        timed = ~np.isnan(minutes)
+        measures = sign * np.column_stack([np.ones(len(days)), timed, np.where(timed, minutes, 0.0)])
+        for dimension in self.dimensions:
+            column = rows[dimension][valid] if dimension in rows.columns else pd.Series("", index=rows.index[valid])
+            cells = self._cells[dimension]
+            cells.append(_merge_cells([(days, self._codes(dimension, column), measures)]))
+            if len(cells) > MAX_CELL_PARTS:
+                self._cells[dimension] = [_merge_cells(cells)]
+
+    # Codes of a column's labels in this dimension's values, adding new values
+    def _codes(self, dimension, column):
+        codes, labels = _factorize(column)
+        values = self.values[dimension]
+        positions = values.get_indexer(labels)
+        new = labels[positions < 0]
+        if len(new):
+            self.values[dimension] = values.append(new)
+            positions = self.values[dimension].get_indexer(labels)
+        return positions[codes]
+
+    # Cells of every part with days in [first, last), as (days, codes, measures)
+    def _range(self, dimension, first, last):
+        for days, codes, measures in self._cells[dimension]:
+            start, stop = np.searchsorted(days, [first, last])
+            yield days[start:stop], codes[start:stop], measures[start:stop]
+
+    # Measures summed per value over [first, last), as (values, measures)
+    def _totals(self, dimension, first, last):
+        width = len(self.values[dimension])
+        totals = np.zeros((width, len(RELIABILITY_MEASURES)))
+        for _, codes, measures in self._range(dimension, first, last):
+            for position in range(len(RELIABILITY_MEASURES)):
+                totals[:, position] += np.bincount(codes, weights=measures[:, position], minlength=width)
+        return totals
+
+    # [first, last) as day numbers (days since the epoch), clipped to the
+    # data; the period length in days is that of the requested range
+    def _bounds(self, start_date, end_date):
+        data_first = int(self.first_day.astype(np.int64))
+        data_last = data_first + self.days
+        first = data_first if start_date is None else int(np.datetime64(pd.Timestamp(start_date).date(), "D")
+                                                          .astype(np.int64))
+        last = data_last if end_date is None else int(np.datetime64(pd.Timestamp(end_date).date(), "D")
+                                                      .astype(np.int64)) + 1
+        return (min(max(first, data_first), data_last), min(max(last, data_first), data_last),
+                max(last - first, 0))
+
+    # Last day with an event (None when empty)
+    def last_day(self):
+        with self._lock:
+            return pd.Timestamp(self.first_day + self.days - 1) if self.days else None
+
+    # Events, downtime, MTTR and MTBF (minutes) and availability per value of
+    # a dimension over a date range (all days when no range). Every value is
+    # treated as running operating_hours a day over the whole range, so for
+    # Process Name this is each process's availability.
+    def kpis(self, dimension, start_date=None, end_date=None):
+        with self._lock:
+            if not self.days:
+                return _kpi_frame(np.zeros((0, len(RELIABILITY_MEASURES))), 0, self.values[dimension], dimension)
+            first, last, period_days = self._bounds(start_date, end_date)
+            totals = self._totals(dimension, first, last)
+            values = self.values[dimension]
+        return _kpi_frame(totals, period_days * self.operating_minutes, values, dimension)
+
+    # Totals across the values of the first dimension (the plant as a whole,
+    # from its processes): MTTR over all timed events, and MTBF and
+    # availability with every process running operating_hours a day
+    def overall(self, start_date=None, end_date=None):
+        dimension = self.dimensions[0]
+        with self._lock:
+            if not self.days:
+                return {"events": 0, "downtime_minutes": 0.0, "mttr_minutes": np.nan, "mtbf_minutes": np.nan,
+                        "availability": np.nan}
+            first, last, period_days = self._bounds(start_date, end_date)
+            totals = self._totals(dimension, first, last)
+        period = period_days * self.operating_minutes
+        count, timed, minutes = totals.sum(axis=0)
+        uptime = np.clip(period - totals[:, 2], 0, None).sum()
+        return {
+            "events": int(count),
+            "downtime_minutes": float(minutes),
+            "mttr_minutes": minutes / timed if timed else np.nan,
+            "mtbf_minutes": uptime / count if count else np.nan,
+            "availability": uptime / (period * len(totals)) if period and len(totals) else np.nan,
+        }
+
+    # Rolling downtime (or another measure) over the last `window` days, one
+    # row per day in the range and one column per value (only the given
+    # values when there are many and just a few are shown)
+    def rolling(self, dimension, window, start_date=None, end_date=None, measure="minutes", values=None):
+        with self._lock:
+            values = self.values[dimension] if values is None else pd.Index(values)
+            if not self.days:
+                return pd.DataFrame(columns=values)
+            first, last, _ = self._bounds(start_date, end_date)
+            columns = np.full(len(self.values[dimension]), -1)
+            positions = self.values[dimension].get_indexer(values)
+            columns[positions[positions >= 0]] = np.flatnonzero(positions >= 0)
+            # Daily sums from window - 1 days before the range, then running sums
+            origin = first - window + 1
+            daily = np.zeros((last - origin, len(values)))
+            for days, codes, measures in self._range(dimension, origin, last):
+                kept = columns[codes] >= 0
+                np.add.at(daily, (days[kept] - origin, columns[codes[kept]]),
+                          measures[kept, RELIABILITY_MEASURES.index(measure)])
+            running = np.vstack([np.zeros((1, len(values))), np.cumsum(daily, axis=0)])
+            sums = running[window:] - running[:-window]
+            index = pd.DatetimeIndex(np.arange(first, last).astype("datetime64[D]"), name="day")
+        return pd.DataFrame(sums, index=index, columns=values)
+
+
+def _kpi_frame(totals, period_minutes, values, dimension):
+    count, timed, minutes = totals[:, 0], totals[:, 1], totals[:, 2]
+    uptime = np.clip(period_minutes - minutes, 0, None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame = pd.DataFrame({
+            "events": count.astype(int),
+            "downtime_minutes": minutes,
+            "mttr_minutes": np.where(timed > 0, minutes / timed, np.nan),
+            "mtbf_minutes": np.where(count > 0, uptime / count, np.nan),
+            "availability": uptime / period_minutes if period_minutes else np.full(len(values), np.nan),
+        }, index=pd.Index(values, name=dimension))
+    return frame.sort_values("downtime_minutes", ascending=False, kind="stable")
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from analytics import HIGH_RESOLUTION_COLUMNS, TOP_ROOT_CAUSES, downtime_report
+from schema import normalize_downtime
+
+
+SHEET = "Project Management"
+DOWNTIME = "Downtime Issues"
+
+# Issues listed per site in the JSON reports (all of them are counted)
+MAX_HIGH_RESOLUTION_ROWS = 50
+
+
+# "name=source" -> (name, source); without a name the file stem (or the
+# spreadsheet name) is used
+def parse_source(spec):
+    name, separator, source = spec.partition("=")
+    if not separator or "/" in name or "\\" in name or name.startswith("sheet:"):
+        name, source = None, spec
+    if name is None:
+        name = source[len("sheet:"):].split("/")[0] if source.startswith("sheet:") else Path(source).stem
+    return name, source
+
+
+# Raw "Downtime Issues" rows of one source:
+#   sheet:<Spreadsheet>[/<Worksheet>]  - Google Sheet (service account credentials)
+#   *.csv / *.xlsx                     - sheet exports
+#   *.db                               - the app's local SQLite store
+def load_source(source, credentials=None):
+    if source.startswith("sheet:"):
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        sheet_name, _, worksheet_name = source[len("sheet:"):].partition("/")
+        creds = Credentials.from_service_account_file(credentials, scopes=[
+            "https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"])
+        worksheet = gspread.authorize(creds).open(sheet_name).worksheet(worksheet_name or DOWNTIME)
+        return pd.DataFrame(worksheet.get_all_records())
+    if not Path(source).is_file():
+        # SQLiteBackend would quietly create an empty store for a mistyped path
+        raise FileNotFoundError(f"No such file: {source}")
+    suffix = Path(source).suffix.lower()
+    if suffix == ".csv":
+        return pd.read_csv(source, keep_default_na=False)
+    if suffix in (".xlsx", ".xls"):
+        return pd.read_excel(source, sheet_name=DOWNTIME)
+    if suffix == ".db":
+        from storage import SQLiteBackend
+
+        return SQLiteBackend(source).load(SHEET, DOWNTIME)
+    raise ValueError(f"Unsupported source: {source}")
+
+
+# Load and analyze one site (runs in a worker process). Returns plain data
+# only, so it pickles cheaply back to the parent.
+def analyze_site(name, source, start_date=None, end_date=None, open_only=False, credentials=None,
+                 top_n=TOP_ROOT_CAUSES):
+    try:
+        data = normalize_downtime(load_source(source, credentials))
+        report = downtime_report(data, start_date, end_date, open_only, top_n=top_n)
+    except Exception as e:
+        return {"site": name, "source": source, "error": f"{type(e).__name__}: {e}"}
+    high_resolution = report["high_resolution"]
+    columns = [c for c in HIGH_RESOLUTION_COLUMNS if c in high_resolution.columns]
+    return {
+        "site": name,
+        "source": source,
+        "rows": len(data),
+        "statistics": report["statistics"],
+        "pareto": {str(k): float(v) for k, v in report["pareto"].items()},
+        "top_root_causes": {str(k): int(v) for k, v in report["top_root_causes"].items()},
+        "high_resolution_count": len(high_resolution),
+        "high_resolution": high_resolution[columns].head(MAX_HIGH_RESOLUTION_ROWS).astype(str).to_dict("records"),
+        "monthly_trend": {pd.Timestamp(k).strftime("%Y-%m"): float(v) for k, v in report["monthly_trend"].items()},
+        "recommendations": report["recommendations"],
+        "warning": report["warning"],
+    }
+
+
+# Analyze every site, in parallel across a process pool when workers > 1.
+# Results come back in the order the sources were given.
+def run_reports(sources, workers=None, **options):
+    if workers == 1 or len(sources) == 1:
+        return [analyze_site(name, source, **options) for name, source in sources]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyze_site, name, source, **options): position
+                   for position, (name, source) in enumerate(sources)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return [results[position] for position in range(len(sources))]
+
+
+def _file_name(site):
+    return re.sub(r"[^\w.-]+", "_", site).strip("_") or "site"
+
+
+# One row per site: statistics, top root cause and high-resolution count
+def summary_frame(results):
+    rows = []
+    for result in results:
+        if "error" in result:
+            rows.append({"site": result["site"], "source": result["source"], "error": result["error"]})
+            continue
+        top = next(iter(result["top_root_causes"]), "")
+        rows.append({"site": result["site"], "source": result["source"], "rows": result["rows"],
+                     **result["statistics"], "top_root_cause": top,
+                     "high_resolution_issues": result["high_resolution_count"], "warning": bool(result["warning"])})
+    summary = pd.DataFrame(rows).convert_dtypes()
+    if "avg_resolution_time" in summary.columns:
+        summary["avg_resolution_time"] = summary["avg_resolution_time"].round(2)
+    return summary
+
+
+# A "key -> value" section of every site as one table (keys x sites), with a
+# Total column across sites
+def consolidated_frame(results, section):
+    frame = pd.DataFrame({r["site"]: pd.Series(r[section], dtype=float) for r in results if "error" not in r})
+    if frame.empty:
+        return frame
+    frame = frame.fillna(0)
+    frame["Total"] = frame.sum(axis=1)
+    return frame
+
+
+def markdown_report(results, summary, pareto):
+    lines = ["# Downtime Report", ""]
+    if not summary.empty:
+        lines += _markdown_table(summary) + [""]
+    if not pareto.empty:
+        top = pareto.sort_values("Total", ascending=False).head(10)
+        lines += ["## Top Downtime Reasons (minutes, all sites)", ""]
+        lines += [f"- **{reason}**: {total:,.0f}" for reason, total in top["Total"].items()] + [""]
+    for result in results:
+        lines += [f"## {result['site']}", ""]
+        if "error" in result:
+            lines += [f"Failed: {result['error']}", ""]
+            continue
+        statistics = result["statistics"]
+        lines += [f"- **Total Issues:** {statistics['total_issues']}",
+                  f"- **Open Issues:** {statistics['open_issues']}",
+                  f"- **Closed Issues:** {statistics['closed_issues']}",
+                  f"- **Avg Resolution Time:** {statistics['avg_resolution_time']:.2f} minutes", ""]
+        if result["top_root_causes"]:
+            lines += ["### Top Root Causes", ""]
+            lines += [f"- **{cause}**: {count} occurrences" for cause, count in result["top_root_causes"].items()]
+            lines += [""]
+        lines += ["### Recommendations", ""] + [f"- {text}" for text in result["recommendations"]]
+        if result["warning"]:
+            lines += [f"- {result['warning']}"]
+        lines += [""]
+    return "\n".join(lines)
+
+
+def _markdown_table(frame):
+    frame = frame.astype(object).fillna("").astype(str)
+    lines = ["| " + " | ".join(frame.columns) + " |", "|" + "---|" * len(frame.columns)]
+    return lines + ["| " + " | ".join(row) + " |" for row in frame.itertuples(index=False)]
+
+
+# Write the per-site JSON reports and the consolidated summary.csv,
+# pareto.csv, monthly_trend.csv and report.md to output
+def write_reports(results, output):
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    for result in results:
+        (output / f"{_file_name(result['site'])}.json").write_text(json.dumps(result, indent=2, default=str))
+    summary = summary_frame(results)
+    pareto = consolidated_frame(results, "pareto")
+    summary.to_csv(output / "summary.csv", index=False)
+    pareto.rename_axis("Downtime Reason").to_csv(output / "pareto.csv")
+    consolidated_frame(results, "monthly_trend").sort_index().rename_axis("Month").to_csv(output / "monthly_trend.csv")
+    (output / "report.md").write_text(markdown_report(results, summary, pareto))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Downtime statistics, Pareto, root causes, trends and suggestions for one or more sites.")
+    parser.add_argument("sources", nargs="+",
+                        help="[name=]source, where source is a CSV/XLSX export, a local .db store or "
+                             "sheet:<Spreadsheet>[/<Worksheet>]")
+    parser.add_argument("--output", default="reports", help="Directory to write the reports to (default: reports)")
+    parser.add_argument("--start", help="First date to include (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date to include (YYYY-MM-DD)")
+    parser.add_argument("--open-only", action="store_true", help="Only open issues")
+    parser.add_argument("--top", type=int, default=TOP_ROOT_CAUSES, help="Root causes listed per site")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument("--credentials", default=os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"),
+                        help="Service account JSON for sheet: sources")
+    args = parser.parse_args(argv)
+
+    sources = [parse_source(spec) for spec in args.sources]
+    names = [name for name, _ in sources]
+    if len(set(names)) != len(names):
+        parser.error("Site names must be unique (use name=source)")
+    if any(source.startswith("sheet:") for _, source in sources) and not args.credentials:
+        parser.error("sheet: sources need --credentials (or GOOGLE_APPLICATION_CREDENTIALS)")
+
+    results = run_reports(sources, workers=args.workers, start_date=args.start, end_date=args.end,
+                          open_only=args.open_only, credentials=args.credentials, top_n=args.top)
+    summary = write_reports(results, args.output)
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(summary.to_string(index=False))
+    print(f"\nReports written to {args.output}")
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import threading
+
+import pandas as pd
+
+from schema import MINUTES_COLUMN, edited_rows
+
+
+# Columns the downtime rollup is grouped by
+ROLLUP_DIMENSIONS = ["Downtime Reason", "Root Cause", "Process Name"]
+
+# Measures kept for every (day, value) group:
+#   count        - downtime events
+#   timed        - events with a numeric Time to Resolve (for averages)
+#   minutes      - total Time to Resolve (Minutes)
+#   open/closed  - events whose Status is / isn't "Closed"
+#   open_timed   - open events with a numeric Time to Resolve
+#   open_minutes - Time to Resolve of open events only
+ROLLUP_MEASURES = ["count", "timed", "minutes", "open", "closed", "open_timed", "open_minutes"]
+
+
+# Per-row measures of downtime rows (raw or typed), plus the day they fall on
+def _measures(data):
+    minutes = pd.to_numeric(data[MINUTES_COLUMN], errors="coerce") if MINUTES_COLUMN in data.columns \
+        else pd.Series(float("nan"), index=data.index)
+    closed = (data["Status"] == "Closed") if "Status" in data.columns else pd.Series(False, index=data.index)
+    open_ = ~closed
+    timed = minutes.notna()
+    return pd.DataFrame({
+        "day": pd.to_datetime(data["Date"], errors="coerce").dt.normalize() if "Date" in data.columns
+        else pd.Series(pd.NaT, index=data.index),
+        "count": 1,
+        "timed": timed.astype(int),
+        "minutes": minutes.fillna(0),
+        "open": open_.astype(int),
+        "closed": closed.astype(int),
+        "open_timed": (timed & open_).astype(int),
+        "open_minutes": minutes.where(open_, 0).fillna(0),
+    }, index=data.index)
+
+
+# Daily aggregates of raw downtime rows for one dimension, indexed by (day, value)
+def daily_rollup(data, dimension, measures=None):
+    if measures is None:
+        measures = _measures(data)
+    values = data[dimension].astype(object).fillna("") if dimension in data.columns else pd.Series("", index=data.index)
+    frame = measures.assign(**{dimension: values.astype(str)})
+    return frame.groupby(["day", dimension], dropna=False)[ROLLUP_MEASURES].sum().sort_index()
+
+
+# Daily downtime aggregates by Downtime Reason, Root Cause and Process Name.
+# Built once from the raw rows, then kept current by adding only the rows
+# appended since; the dashboard views read these instead of the raw rows, so
+# their cost depends on the number of (day, value) groups, not on history size.
+class DowntimeRollup:
+    def __init__(self, dimensions=ROLLUP_DIMENSIONS):
+        self.dimensions = list(dimensions)
+        self.rows = 0
+        self.edited = 0
+        self.version = None
+        self.tables = {dimension: self._empty(dimension) for dimension in self.dimensions}
+        self._data = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty(dimension):
+        index = pd.MultiIndex.from_arrays([pd.DatetimeIndex([]), pd.Index([], dtype=object)], names=["day", dimension])
+        return pd.DataFrame(0, index=index, columns=ROLLUP_MEASURES)
+
+    # Bring the rollup up to date with the full set of rows. version identifies
+    # the non-append state of the source (see the storage backends' version());
+    # when it is unchanged only rows beyond the ones already counted are added,
+    # and rows with cells edited since (edits) are taken out as they were in
+    # the last data synced and counted again as they are now.
+    def sync(self, data, version=None, edits=()):
+        with self._lock:
+            if version != self.version or len(data) < self.rows or len(edits) < self.edited:
+                self.tables = {dimension: self._empty(dimension) for dimension in self.dimensions}
+                self.rows = 0
+            elif len(edits) > self.edited and self._data is not None:
+                positions, _ = edited_rows(edits[self.edited:], self.rows)
+                if positions:
+                    self._add(self._data.iloc[positions], sign=-1)
+                    self._add(data.iloc[positions])
+            if len(data) > self.rows:
+                self._add(data.iloc[self.rows:])
+                self.rows = len(data)
+            self.edited = len(edits)
+            self.version = version
+            self._data = data
+
+    # Count newly appended rows
+    def add(self, rows):
+        with self._lock:
+            self._add(rows)
+            self.rows += len(rows)
+
+    # Add the measures of rows to the day buckets (sign=-1 takes them out)
+    def _add(self, rows, sign=1):
+        measures = _measures(rows)
+        if sign != 1:
+            measures[ROLLUP_MEASURES] *= sign
+        for dimension in self.dimensions:
+            new = daily_rollup(rows, dimension, measures)
+            self.tables[dimension] = self.tables[dimension].add(new, fill_value=0).astype(float).sort_index()
+
+    def _slice(self, dimension, start_date=None, end_date=None):
+        table = self.tables[dimension]
+        if start_date is None and end_date is None:
+            return table
+        days = table.index.get_level_values("day")
+        mask = days.notna()
+        if start_date is not None:
+            mask &= days >= pd.to_datetime(start_date)
+        if end_date is not None:
+            mask &= days <= pd.to_datetime(end_date)
+        return table[mask]
+
+    # Measures per value of a dimension over a date range (all days when no range)
+    def totals(self, dimension, start_date=None, end_date=None):
+        with self._lock:
+            table = self._slice(dimension, start_date, end_date)
+        return table.groupby(level=dimension).sum()
+
+    # Measures per day over a date range, across all values
+    def daily(self, start_date=None, end_date=None):
+        with self._lock:
+            table = self._slice(self.dimensions[0], start_date, end_date)
+        return table.groupby(level="day").sum()
+
+    # Measures per calendar month (timestamped at the start of the month)
+    def monthly(self, start_date=None, end_date=None):
+        daily = self.daily(start_date, end_date)
+        daily = daily[daily.index.notna()]
+        monthly = daily.groupby(daily.index.to_period("M")).sum()
+        monthly.index = monthly.index.to_timestamp()
+        return monthly
+
+    # Measures summed over every row, including rows without a valid Date
+    def overall(self):
+        with self._lock:
+            return self.tables[self.dimensions[0]].sum()
+
+
+# Minutes (or open-issue minutes) per value, largest first, for a Pareto chart
+def pareto_series(rollup, dimension="Downtime Reason", start_date=None, end_date=None, open_only=False):
+    totals = rollup.totals(dimension, start_date, end_date)
+    column = "open_minutes" if open_only else "minutes"
+    counted = totals["open"] if open_only else totals["count"]
+    return totals.loc[counted > 0, column].sort_values(ascending=False)
+
+
+# Most frequent values of a dimension (like value_counts().head(n))
+def top_values(rollup, dimension="Root Cause", n=3, start_date=None, end_date=None, open_only=False):
+    totals = rollup.totals(dimension, start_date, end_date)
+    counts = totals["open" if open_only else "count"].astype(int)
+    return counts[counts > 0].sort_values(ascending=False, kind="stable").head(n)
+
+
+# Keep the n largest values of a Pareto series (largest first) and sum the
+# rest into one "Other (k)" bar at the end; n = 0 keeps everything
+def pareto_top(series, n):
+    if not n or len(series) <= n:
+        return series
+    other = pd.Series({f"Other ({len(series) - n})": series.iloc[n:].sum()})
+    return pd.concat([series.iloc[:n], other])
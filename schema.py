@@ -0,0 +1,97 @@
+import threading
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from keys import key_texts
+
+
+MINUTES_COLUMN = "Time to Resolve (Minutes)"
+
+# Low-cardinality text columns of "Downtime Issues", stored as categoricals
+DOWNTIME_CATEGORIES = ["Process Name", "Downtime Reason", "Root Cause", "Status", "Resolved (Y/N)"]
+
+
+# Typed copy of raw "Downtime Issues" rows (as returned by get_all_records):
+# Key as text (old numeric keys and generated ones alike), Date as datetime64,
+# Time to Resolve as float and the columns in DOWNTIME_CATEGORIES as
+# categoricals. Unparseable values become NaT/NaN; blank values stay "".
+def normalize_downtime(data):
+    data = data.copy()
+    if "Key" in data.columns:
+        data["Key"] = key_texts(data["Key"])
+    if "Date" in data.columns:
+        data["Date"] = pd.to_datetime(data["Date"], errors="coerce")
+    if MINUTES_COLUMN in data.columns:
+        data[MINUTES_COLUMN] = pd.to_numeric(data[MINUTES_COLUMN], errors="coerce").astype(float)
+    for column in DOWNTIME_CATEGORIES:
+        if column in data.columns:
+            data[column] = data[column].fillna("").astype(str).astype("category")
+    return data
+
+
+# Concatenate typed frames without losing the categoricals (a plain concat
+# falls back to object columns when the categories differ)
+def concat_typed(frames):
+    data = pd.concat(frames, ignore_index=True)
+    for column in DOWNTIME_CATEGORIES:
+        parts = [frame[column] for frame in frames if column in frame.columns]
+        if len(parts) == len(frames) and all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            data[column] = union_categoricals(parts, ignore_order=True)
+    return data
+
+
+# Positions (0-based data rows) and columns touched by cell edits, as listed
+# by the storage backends' edits(), limited to the first `rows` rows
+def edited_rows(edits, rows):
+    positions = sorted({row - 2 for row, _ in edits if 2 <= row < rows + 2})
+    return positions, {column for _, column in edits}
+
+
+# Typed "Downtime Issues" frame shared by every session. Rows are parsed once:
+# a sync with the same version only parses the rows appended since and the
+# rows whose cells were edited (edits, see the backends' edits()); anything
+# else (a reload, a column change) re-parses everything. The returned frame is
+# shared; callers must not modify it in place (edits swap in patched columns).
+class TypedDowntime:
+    def __init__(self):
+        self.data = normalize_downtime(pd.DataFrame())
+        self.rows = 0
+        self.edited = 0
+        self.version = None
+        self._lock = threading.Lock()
+
+    def sync(self, raw, version=None, edits=()):
+        with self._lock:
+            if version != self.version or len(raw) < self.rows or list(raw.columns) != list(self.data.columns) \
+                    or len(edits) < self.edited:
+                self.data = normalize_downtime(raw)
+            else:
+                if len(edits) > self.edited:
+                    self._patch(raw, edits[self.edited:])
+                if len(raw) > self.rows:
+                    self.data = concat_typed([self.data, normalize_downtime(raw.iloc[self.rows:])])
+            self.rows = len(raw)
+            self.edited = len(edits)
+            self.version = version
+            return self.data
+
+    # Re-parse only the edited rows and swap the edited columns in
+    def _patch(self, raw, edits):
+        positions, columns = edited_rows(edits, self.rows)
+        columns = [column for column in self.data.columns if column in columns]
+        if not positions or not columns:
+            return
+        fresh = normalize_downtime(raw.iloc[positions][columns])
+        data = self.data.copy(deep=False)
+        for column in columns:
+            values = data[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                missing = fresh[column].cat.categories.difference(values.cat.categories)
+                values = values.cat.add_categories(missing) if len(missing) else values.copy()
+                values.iloc[positions] = fresh[column].astype(str).to_numpy()
+            else:
+                values = values.copy()
+                values.iloc[positions] = fresh[column].to_numpy()
+            data[column] = values
+        self.data = data
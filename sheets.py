@@ -0,0 +1,313 @@
+import re
+import threading
+import time
+
+import pandas as pd
+
+from keys import key_text
+
+
+# Default number of seconds a cached worksheet stays fresh
+DEFAULT_CACHE_TTL = 60
+
+# Rows at the end of a worksheet re-read by probe_worksheet to spot edits
+DEFAULT_TAIL_ROWS = 20
+
+# Default number of seconds between full re-downloads of a worksheet that is
+# otherwise synced incrementally (picks up in-place edits made elsewhere)
+DEFAULT_RECONCILE_INTERVAL = 15 * 60
+
+
+# One cached worksheet: its rows, when they were last confirmed current, when
+# they were last fully re-downloaded, a generation number that changes on
+# every change other than appended rows and cell updates, the cells updated
+# since ((sheet row, column name), oldest first), and whether rows are known
+# to be missing below the cached ones (stale until the tail is read again)
+class _Entry:
+    def __init__(self, data, generation):
+        self.data = data
+        self.generation = generation
+        self.edits = []
+        self.loaded_at = time.monotonic()
+        self.reconciled_at = self.loaded_at
+        self.stale = False
+
+
+# Process-wide cache of worksheet contents, shared by every session/rerun.
+# Keys are (sheet_name, worksheet_name); values are the DataFrame returned by
+# get_all_records() together with the time it was loaded.
+class WorksheetCache:
+    def __init__(self, ttl=DEFAULT_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self._entries = {}
+        self._headers = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _fresh(self, loaded_at):
+        return self.ttl is None or (time.monotonic() - loaded_at) < self.ttl
+
+    # Return the cached frame, or None on a miss/expiry. The frame is shared
+    # by every session (no copy per rerun), callers must not modify it.
+    def get(self, sheet_name, worksheet_name):
+        with self._lock:
+            entry = self._entries.get((sheet_name, worksheet_name))
+            if entry is not None and not entry.stale and self._fresh(entry.loaded_at):
+                self.hits += 1
+                return entry.data
+            self.misses += 1
+            return None
+
+    # Return the cached frame (fresh or not) and the seconds since it was last
+    # fully re-downloaded, without touching the counters. The frame is shared,
+    # callers must not modify it.
+    def peek(self, sheet_name, worksheet_name):
+        with self._lock:
+            entry = self._entries.get((sheet_name, worksheet_name))
+            if entry is None:
+                return None, None
+            return entry.data, time.monotonic() - entry.reconciled_at
+
+    def _next_generation(self):
+        self._generation += 1
+        return self._generation
+
+    # Generation of a cached worksheet (None when not cached). Rows appended
+    # and cells updated since don't change it, so derived data keyed on it
+    # can be extended and patched instead of rebuilt.
+    def generation(self, sheet_name, worksheet_name):
+        with self._lock:
+            entry = self._entries.get((sheet_name, worksheet_name))
+            return entry.generation if entry is not None else None
+
+    # Cells updated since the generation started, as (sheet row, column name)
+    def edits(self, sheet_name, worksheet_name):
+        with self._lock:
+            entry = self._entries.get((sheet_name, worksheet_name))
+            return tuple(entry.edits) if entry is not None else ()
+
+    # Store a full download of a worksheet
+    def put(self, sheet_name, worksheet_name, data):
+        with self._lock:
+            self._entries[(sheet_name, worksheet_name)] = _Entry(data.copy(), self._next_generation())
+            self.full_loads += 1
+
+    # Add rows fetched from the tail of a worksheet and mark it fresh again.
+    # base_rows is the row count the tail was read after; if the entry changed
+    # in the meantime the rows are dropped and None is returned. The returned
+    # frame is shared, callers must not modify it.
+    def extend(self, sheet_name, worksheet_name, rows, base_rows):
+        with self._lock:
+            entry = self._entries.get((sheet_name, worksheet_name))
+            if entry is None or len(entry.data) != base_rows:
+                return None
+            if not rows.empty:
+                entry.data = pd.concat([entry.data, rows], ignore_index=True)
+            entry.loaded_at = time.monotonic()
+            entry.stale = False
+            self.incremental_loads += 1
+            return entry.data
+
+    # Drop one worksheet (or everything when called without arguments)
+    def invalidate(self, sheet_name=None, worksheet_name=None):
+        with self._lock:
+            if sheet_name is None:
+                self._entries.clear()
+                self._headers.clear()
+            else:
+                self._entries.pop((sheet_name, worksheet_name), None)
+                self._headers.pop((sheet_name, worksheet_name), None)
+
+    # Header name -> 1-based column number. Headers don't expire with the TTL,
+    # they are only dropped by invalidate().
+    def get_headers(self, sheet_name, worksheet_name):
+        with self._lock:
+            return self._headers.get((sheet_name, worksheet_name))
+
+    def put_headers(self, sheet_name, worksheet_name, headers):
+        with self._lock:
+            self._headers[(sheet_name, worksheet_name)] = dict(headers)
+
+    # Patch a cached worksheet with rows that were just appended to the sheet,
+    # first_row being the sheet row the append started at (see appended_row).
+    # When that isn't right after the cached rows (another writer appended
+    # first, or it's unknown) the rows are left out and the entry marked
+    # stale, so the next load reads everything below the cached rows instead.
+    # Falls back to invalidation when the new rows don't fit the cached columns.
+    def append_rows(self, sheet_name, worksheet_name, rows, first_row):
+        key = (sheet_name, worksheet_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if not entry.data.empty and not set(rows.columns) <= set(entry.data.columns):
+                del self._entries[key]
+                return
+            if first_row != len(entry.data) + 2:
+                entry.stale = True
+                return
+            entry.data = pd.concat([entry.data, rows], ignore_index=True)
+
+    # Patch a single cell using sheet coordinates (1-based, row 1 is the header)
+    def update_cell(self, sheet_name, worksheet_name, row, col, value):
+        key = (sheet_name, worksheet_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            cached = entry.data
+            if 2 <= row <= len(cached) + 1 and 1 <= col <= len(cached.columns):
+                # Readers may hold the cached frame: patch a copy of the one
+                # column and swap it in, leaving the other columns shared
+                column = cached.columns[col - 1]
+                values = cached[column].to_numpy(dtype=object, copy=True)
+                values[row - 2] = value
+                patched = cached.copy(deep=False)
+                patched[column] = values
+                entry.data = patched
+                entry.edits.append((row, column))
+            else:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "full_loads": self.full_loads,
+                "incremental_loads": self.incremental_loads,
+                "cached_worksheets": len(self._entries),
+                "ttl": self.ttl,
+            }
+
+
+# First sheet row written by an append_rows call, from the API response's
+# updates.updatedRange (e.g. "'Downtime Issues'!A120:K121"); None when missing
+def appended_row(response):
+    updated = ((response or {}).get("updates") or {}).get("updatedRange") or ""
+    match = re.search(r"(?:^|!)\$?[A-Z]+\$?(\d+)", updated)
+    return int(match.group(1)) if match else None
+
+
+# Load a worksheet through the cache. When incremental, a stale worksheet only
+# fetches the rows appended after the cached ones; a full get_all_records() is
+# done on the first load and then every reconcile_interval seconds.
+def sync_worksheet(cache, sheet_name, worksheet, incremental=False,
+                   reconcile_interval=DEFAULT_RECONCILE_INTERVAL):
+    data = cache.get(sheet_name, worksheet.title)
+    if data is not None:
+        return data
+
+    if incremental:
+        cached, since_reconcile = cache.peek(sheet_name, worksheet.title)
+        if cached is not None and len(cached.columns) and since_reconcile < reconcile_interval:
+            base_rows = len(cached)
+            new_rows = fetch_new_rows(worksheet, cached.columns, base_rows)
+            data = cache.extend(sheet_name, worksheet.title, new_rows, base_rows)
+            if data is not None:
+                return data
+
+    data = pd.DataFrame(worksheet.get_all_records())
+    cache.put(sheet_name, worksheet.title, data)
+    return data
+
+
+# Read the rows below the first known_rows data rows, shaped like get_all_records()
+def fetch_new_rows(worksheet, columns, known_rows):
+    from gspread.utils import numericise_all, rowcol_to_a1
+    first_row = known_rows + 2  # 1-based, skip the header
+    last_column = rowcol_to_a1(1, len(columns))[:-1]
+    values = worksheet.get(f"A{first_row}:{last_column}")
+    rows = [numericise_all(row + [""] * (len(columns) - len(row))) for row in values]
+    return pd.DataFrame(rows, columns=columns)
+
+
+# Same values, comparing numbers as numbers (the cache may hold 30 where a
+# fresh read has 30.0, or "30" after a cell update)
+def _same_rows(cached, fetched):
+    if len(cached) != len(fetched):
+        return False
+    for column in cached.columns:
+        old = cached[column].reset_index(drop=True)
+        new = fetched[column].reset_index(drop=True)
+        old_numbers = pd.to_numeric(old, errors="coerce")
+        new_numbers = pd.to_numeric(new, errors="coerce")
+        numeric = old_numbers.notna() & new_numbers.notna()
+        if not (old_numbers[numeric] == new_numbers[numeric]).all():
+            return False
+        if not (old[~numeric].astype(str) == new[~numeric].astype(str)).all():
+            return False
+    return True
+
+
+# Check a cached worksheet against the sheet with a single read of its last
+# tail_rows rows and everything below them, and bring the cache up to date:
+# new rows are added, a changed or shortened tail (edits, deletes, sorting)
+# means a full re-download, as does reaching reconcile_interval. Returns
+# "unchanged", "appended" or "reloaded"; None when the worksheet isn't cached
+# (nothing to compare) or the cache changed while the tail was read.
+def probe_worksheet(cache, sheet_name, worksheet, tail_rows=DEFAULT_TAIL_ROWS,
+                    reconcile_interval=DEFAULT_RECONCILE_INTERVAL):
+    cached, since_reconcile = cache.peek(sheet_name, worksheet.title)
+    if cached is None or not len(cached.columns):
+        return None
+    base_rows = len(cached)
+    known = min(tail_rows, base_rows)
+    if since_reconcile < reconcile_interval:
+        rows = fetch_new_rows(worksheet, cached.columns, base_rows - known)
+        if len(rows) >= known and _same_rows(cached.iloc[base_rows - known:], rows.iloc[:known]):
+            new_rows = rows.iloc[known:].reset_index(drop=True)
+            if cache.extend(sheet_name, worksheet.title, new_rows, base_rows) is None:
+                return None
+            return "appended" if len(new_rows) else "unchanged"
+    cache.put(sheet_name, worksheet.title, pd.DataFrame(worksheet.get_all_records()))
+    return "reloaded"
+
+
+# Resolve the header row of a worksheet once and reuse it for every update
+def header_map(cache, sheet_name, worksheet):
+    headers = cache.get_headers(sheet_name, worksheet.title)
+    if headers is None:
+        headers = {name: col for col, name in enumerate(worksheet.row_values(1), start=1) if name}
+        cache.put_headers(sheet_name, worksheet.title, headers)
+    return headers
+
+
+# Raised when a row no longer holds the record an update was meant for
+# (rows were inserted, deleted or sorted in the sheet since it was loaded)
+class StaleRowError(ValueError):
+    pass
+
+
+# Write any set of {header: value} fields of one sheet row in a single
+# batched request, then patch the cached copy of the worksheet. With match
+# ({header: value}, e.g. the row's Key) the row is checked first with one
+# batch_get and StaleRowError is raised instead of writing to the wrong row.
+def update_row(cache, sheet_name, worksheet, row, fields, match=None):
+    from gspread.utils import rowcol_to_a1
+    headers = header_map(cache, sheet_name, worksheet)
+    missing = [name for name in list(fields) + list(match or {}) if name not in headers]
+    if missing:
+        raise ValueError(f"Column(s) not found in '{worksheet.title}': {', '.join(missing)}")
+
+    if match:
+        found = worksheet.batch_get([rowcol_to_a1(row, headers[name]) for name in match])
+        for (name, expected), value_range in zip(match.items(), found):
+            actual = value_range[0][0] if value_range and value_range[0] else ""
+            if key_text(actual) != key_text(expected):
+                raise StaleRowError(f"Row {row} of '{worksheet.title}' no longer holds {name} {expected}.")
+
+    data = [
+        {"range": rowcol_to_a1(row, headers[name]), "values": [[value]]}
+        for name, value in fields.items()
+    ]
+    worksheet.batch_update(data, value_input_option="USER_ENTERED")
+
+    for name, value in fields.items():
+        cache.update_cell(sheet_name, worksheet.title, row, headers[name], value)
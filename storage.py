@@ -0,0 +1,495 @@
+import contextlib
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from keys import key_text, key_texts
+from sheets import DEFAULT_RECONCILE_INTERVAL, DEFAULT_TAIL_ROWS, StaleRowError, appended_row, fetch_new_rows, \
+    probe_worksheet, sync_worksheet, update_row
+
+
+# Default location of the local store
+DEFAULT_DB_PATH = "project_management.db"
+
+# Default number of seconds between background syncs of the local mirror
+DEFAULT_SYNC_INTERVAL = 60
+
+
+# Rows whose Date falls in [start_date, end_date] (either bound optional) and,
+# optionally, whose Status is not Closed. Used by backends without an index.
+def filter_rows(data, start_date=None, end_date=None, open_only=False):
+    if data.empty:
+        return data
+    mask = pd.Series(True, index=data.index)
+    if open_only and "Status" in data.columns:
+        mask &= data["Status"] != "Closed"
+    if (start_date is not None or end_date is not None) and "Date" in data.columns:
+        dates = pd.to_datetime(data["Date"], errors="coerce")
+        if start_date is not None:
+            mask &= dates >= pd.to_datetime(start_date)
+        if end_date is not None:
+            mask &= dates <= pd.to_datetime(end_date)
+    return data[mask]
+
+
+# Google Sheets as the storage backend: reads go through the shared worksheet
+# cache, writes go straight to the sheet. client may be a function returning
+# the gspread client instead, so authorizing waits until a sheet is first used.
+class SheetsBackend:
+    name = "sheets"
+    indexed = False
+
+    def __init__(self, client, cache, reconcile_interval=DEFAULT_RECONCILE_INTERVAL):
+        self._connect = client if callable(client) else None
+        self._client = None if callable(client) else client
+        self.cache = cache
+        self.reconcile_interval = reconcile_interval
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self._lock = threading.Lock()
+        self.write_watchers = []  # told about this process's writes (see ChangeWatcher.own_write)
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self._connect()
+            return self._client
+
+    # Open a spreadsheet once and reuse the handle
+    def spreadsheet(self, sheet_name):
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(sheet_name)
+        if spreadsheet is None:
+            spreadsheet = self.client.open(sheet_name)
+            with self._lock:
+                self._spreadsheets[sheet_name] = spreadsheet
+        return spreadsheet
+
+    # Open a worksheet once and reuse the handle for later reads/writes
+    def worksheet(self, sheet_name, worksheet_name):
+        key = (sheet_name, worksheet_name)
+        with self._lock:
+            worksheet = self._worksheets.get(key)
+        if worksheet is None:
+            worksheet = self.spreadsheet(sheet_name).worksheet(worksheet_name)
+            with self._lock:
+                self._worksheets[key] = worksheet
+        return worksheet
+
+    def load(self, sheet_name, worksheet_name, incremental=False):
+        worksheet = self.worksheet(sheet_name, worksheet_name)
+        return sync_worksheet(self.cache, sheet_name, worksheet, incremental=incremental,
+                              reconcile_interval=self.reconcile_interval)
+
+    def query(self, sheet_name, worksheet_name, start_date=None, end_date=None, open_only=False, incremental=False):
+        data = self.load(sheet_name, worksheet_name, incremental=incremental)
+        return filter_rows(data, start_date, end_date, open_only)
+
+    def _writing(self, sheet_name):
+        stack = contextlib.ExitStack()
+        for watcher in self.write_watchers:
+            stack.enter_context(watcher.own_write(sheet_name))
+        return stack
+
+    def append(self, sheet_name, worksheet_name, rows):
+        worksheet = self.worksheet(sheet_name, worksheet_name)
+        with self._writing(sheet_name):
+            response = worksheet.append_rows(rows.values.tolist(), table_range="A1")
+        self.cache.append_rows(sheet_name, worksheet_name, rows, appended_row(response))
+
+    def update_row(self, sheet_name, worksheet_name, row, fields, match=None):
+        worksheet = self.worksheet(sheet_name, worksheet_name)
+        with self._writing(sheet_name):
+            update_row(self.cache, sheet_name, worksheet, row, fields, match=match)
+
+    # Changes whenever the worksheet changes other than by appended rows or
+    # update_row (whose cells are listed by edits())
+    def version(self, sheet_name, worksheet_name):
+        return self.cache.generation(sheet_name, worksheet_name)
+
+    # Cells updated within the current version, as (sheet row, column name)
+    def edits(self, sheet_name, worksheet_name):
+        return self.cache.edits(sheet_name, worksheet_name)
+
+    # Rows currently cached (None when the worksheet hasn't been loaded)
+    def row_count(self, sheet_name, worksheet_name):
+        data, _ = self.cache.peek(sheet_name, worksheet_name)
+        return len(data) if data is not None else None
+
+    # Which of keys are in the worksheet's Key column, reading only the rows
+    # below the cached ones (and the last tail_rows of those). Checked before
+    # an append is retried, as one that timed out may have been written anyway.
+    def find_keys(self, sheet_name, worksheet_name, keys, tail_rows=DEFAULT_TAIL_ROWS):
+        worksheet = self.worksheet(sheet_name, worksheet_name)
+        cached, _ = self.cache.peek(sheet_name, worksheet_name)
+        if cached is None or "Key" not in cached.columns:
+            data = pd.DataFrame(worksheet.get_all_records())
+        else:
+            data = fetch_new_rows(worksheet, cached.columns, max(0, len(cached) - tail_rows))
+        found = set(key_texts(data["Key"])) if "Key" in data.columns else set()
+        return {key for key in keys if key_text(key) in found}
+
+    # Last modification time of the whole spreadsheet (one Drive API call),
+    # any edit to any of its worksheets changes it
+    def revision(self, sheet_name):
+        return self.spreadsheet(sheet_name).get_lastUpdateTime()
+
+    # Bring a cached worksheet up to date with one read of its tail (see probe_worksheet)
+    def probe(self, sheet_name, worksheet_name, tail_rows=DEFAULT_TAIL_ROWS):
+        worksheet = self.worksheet(sheet_name, worksheet_name)
+        return probe_worksheet(self.cache, sheet_name, worksheet, tail_rows=tail_rows,
+                               reconcile_interval=self.reconcile_interval)
+
+    # Drop cached data (one worksheet, or everything) so the next load re-reads it
+    def refresh(self, sheet_name=None, worksheet_name=None):
+        self.cache.invalidate(sheet_name, worksheet_name)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+# One 64-bit hash per row of data, to tell whether a download changed
+def _row_hashes(data):
+    return pd.util.hash_pandas_object(data, index=False).reset_index(drop=True)
+
+
+# Local SQLite store. Each worksheet is a table keyed by its sheet row number
+# (_row, 2 for the first data row) with an indexed ISO copy of Date (_date),
+# so date-range and open-issue filters don't need a full scan.
+class SQLiteBackend:
+    name = "sqlite"
+    indexed = True
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._generations = {}
+        self._edits = {}
+        self._frames = {}
+        self._hashes = {}  # table -> (columns, row hashes) of what was written to it
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quote(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _table(self, sheet_name, worksheet_name):
+        return self._quote(f"{sheet_name}/{worksheet_name}")
+
+    def _columns(self, table):
+        return [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+
+    # Create the table (or add missing columns) so it can hold every column of data
+    def _ensure_table(self, sheet_name, worksheet_name, columns):
+        table = self._table(sheet_name, worksheet_name)
+        existing = self._columns(table)
+        if not existing:
+            column_defs = ", ".join(self._quote(c) for c in columns)
+            self._conn.execute(f"CREATE TABLE {table} (_row INTEGER PRIMARY KEY, _date TEXT"
+                               + (f", {column_defs}" if column_defs else "") + ")")
+            existing = ["_row", "_date"] + list(columns)
+        for column in columns:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {self._quote(column)}")
+        date_index = self._quote(f"{sheet_name}/{worksheet_name}/date")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {date_index} ON {table} (_date)")
+        if "Status" in columns or "Status" in existing:
+            status_index = self._quote(f"{sheet_name}/{worksheet_name}/status")
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS {status_index} ON {table} ("Status")')
+        return table
+
+    # DataFrame -> list of rows sqlite3 can bind (plain Python values, None for blanks)
+    @staticmethod
+    def _values(data):
+        data = data.copy()
+        for column in data.columns:
+            if pd.api.types.is_datetime64_any_dtype(data[column]):
+                data[column] = data[column].dt.strftime("%Y-%m-%d")
+        data = data.astype(object).where(data.notna(), None)
+        if "Date" in data.columns:
+            dates = pd.to_datetime(data["Date"], errors="coerce").dt.strftime("%Y-%m-%d")
+            iso_dates = dates.astype(object).where(dates.notna(), None)
+        else:
+            iso_dates = pd.Series(None, index=data.index, dtype=object)
+        return [[iso_date] + row for iso_date, row in zip(iso_dates.tolist(), data.values.tolist())]
+
+    def _insert(self, table, data, first_row):
+        columns = ", ".join(["_row", "_date"] + [self._quote(c) for c in data.columns])
+        placeholders = ", ".join(["?"] * (len(data.columns) + 2))
+        rows = [[first_row + i] + values for i, values in enumerate(self._values(data))]
+        self._conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows)
+
+    def _read(self, sql, params=()):
+        try:
+            data = pd.read_sql_query(sql, self._conn, params=params)
+        except pd.errors.DatabaseError:
+            return pd.DataFrame()
+        return data.drop(columns=["_row", "_date"], errors="ignore")
+
+    def row_count(self, sheet_name, worksheet_name):
+        with self._lock:
+            table = self._table(sheet_name, worksheet_name)
+            if not self._columns(table):
+                return 0
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    # The whole table as a frame. The last frame read is kept per table with
+    # the generation and last _row it covers: while the generation holds only
+    # rows appended since are read. The frame is shared, callers must not
+    # modify it.
+    def load(self, sheet_name, worksheet_name, incremental=False):
+        with self._lock:
+            table = self._table(sheet_name, worksheet_name)
+            if not self._columns(table):
+                return pd.DataFrame()
+            generation = self._generations.get(table, 0)
+            last_row = self._conn.execute(f"SELECT COALESCE(MAX(_row), 1) FROM {table}").fetchone()[0]
+            cached = self._frames.get(table)
+            if cached is not None and cached[0] == generation and cached[1] <= last_row:
+                frame = cached[2]
+                if cached[1] == last_row:
+                    return frame
+                new_rows = self._read(f"SELECT * FROM {table} WHERE _row > ? ORDER BY _row", (cached[1],))
+                if list(new_rows.columns) == list(frame.columns):
+                    frame = pd.concat([frame, new_rows], ignore_index=True)
+                    self._frames[table] = (generation, last_row, frame)
+                    return frame
+            frame = self._read(f"SELECT * FROM {table} ORDER BY _row")
+            self._frames[table] = (generation, last_row, frame)
+            return frame
+
+    def query(self, sheet_name, worksheet_name, start_date=None, end_date=None, open_only=False, incremental=False):
+        conditions, params = [], []
+        if start_date is not None:
+            conditions.append("_date >= ?")
+            params.append(pd.to_datetime(start_date).strftime("%Y-%m-%d"))
+        if end_date is not None:
+            conditions.append("_date <= ?")
+            params.append(pd.to_datetime(end_date).strftime("%Y-%m-%d"))
+        with self._lock:
+            table = self._table(sheet_name, worksheet_name)
+            if open_only and "Status" in self._columns(table):
+                conditions.append("\"Status\" IS NOT 'Closed'")
+            where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+            return self._read(f"SELECT * FROM {table}{where} ORDER BY _row", params)
+
+    def append(self, sheet_name, worksheet_name, rows):
+        with self._lock, self._conn:
+            table = self._ensure_table(sheet_name, worksheet_name, list(rows.columns))
+            last_row = self._conn.execute(f"SELECT COALESCE(MAX(_row), 1) FROM {table}").fetchone()[0]
+            self._insert(table, rows, last_row + 1)
+            hashed = self._hashes.pop(table, None)
+            if hashed is not None and hashed[0] == list(rows.columns):
+                self._hashes[table] = (hashed[0], pd.concat([hashed[1], _row_hashes(rows)], ignore_index=True))
+
+    def update_row(self, sheet_name, worksheet_name, row, fields, match=None):
+        with self._lock, self._conn:
+            table = self._table(sheet_name, worksheet_name)
+            columns = self._columns(table)
+            missing = [name for name in list(fields) + list(match or {}) if name not in columns]
+            if missing:
+                raise ValueError(f"Column(s) not found in '{worksheet_name}': {', '.join(missing)}")
+            if match:
+                names = list(match)
+                found = self._conn.execute(f"SELECT {', '.join(self._quote(n) for n in names)} FROM {table} WHERE _row = ?",
+                                           (row,)).fetchone()
+                for name, actual in zip(names, found or [None] * len(names)):
+                    if key_text(actual) != key_text(match[name]):
+                        raise StaleRowError(f"Row {row} of '{worksheet_name}' no longer holds {name} {match[name]}.")
+            assignments = [f"{self._quote(name)} = ?" for name in fields]
+            params = list(fields.values())
+            if "Date" in fields:
+                assignments.append("_date = ?")
+                date_value = pd.to_datetime(fields["Date"], errors="coerce")
+                params.append(None if pd.isna(date_value) else date_value.strftime("%Y-%m-%d"))
+            self._conn.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE _row = ?", params + [row])
+            self._edits.setdefault(table, []).extend((row, name) for name in fields)
+            self._hashes.pop(table, None)
+            self._patch_frame(table, row, fields)
+
+    # Apply an update to the kept frame (rows are stored from _row 2 on, in
+    # order), so the next load doesn't re-read the table; readers may hold the
+    # old frame, so edited columns are copied and swapped in
+    def _patch_frame(self, table, row, fields):
+        cached = self._frames.pop(table, None)
+        if cached is None or not 2 <= row <= cached[1] or len(cached[2]) != cached[1] - 1:
+            return
+        frame = cached[2].copy(deep=False)
+        for name, value in fields.items():
+            values = frame[name].to_numpy(dtype=object, copy=True)
+            values[row - 2] = value
+            frame[name] = values
+        self._frames[table] = (cached[0], cached[1], frame)
+
+    # Replace the stored copy of a worksheet with a full download of it. A
+    # download identical to what was last written is skipped, so the version
+    # (and everything rebuilt from it) only changes when the data did.
+    def replace(self, sheet_name, worksheet_name, data):
+        hashes = _row_hashes(data)
+        with self._lock, self._conn:
+            table = self._table(sheet_name, worksheet_name)
+            hashed = self._hashes.get(table)
+            if hashed is not None and hashed[0] == list(data.columns) and hashed[1].equals(hashes):
+                return
+            self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            table = self._ensure_table(sheet_name, worksheet_name, list(data.columns))
+            self._insert(table, data, 2)
+            self._generations[table] = self._generations.get(table, 0) + 1
+            self._edits.pop(table, None)
+            self._hashes[table] = (list(data.columns), hashes)
+
+    # Which of keys are in the table's Key column
+    def find_keys(self, sheet_name, worksheet_name, keys):
+        keys = [key_text(key) for key in keys]
+        with self._lock:
+            table = self._table(sheet_name, worksheet_name)
+            if "Key" not in self._columns(table) or not keys:
+                return set()
+            found = {key_text(row[0]) for row in self._conn.execute(
+                f'SELECT "Key" FROM {table} WHERE "Key" IN ({", ".join(["?"] * len(keys))})', keys)}
+        return set(keys) & found
+
+    # Add the rows of data beyond the ones already stored (append-only sync)
+    def extend(self, sheet_name, worksheet_name, data):
+        stored = self.row_count(sheet_name, worksheet_name)
+        if len(data) > stored:
+            self.append(sheet_name, worksheet_name, data.iloc[stored:])
+
+    # Changes whenever the table changes other than by appended rows or
+    # update_row (whose cells are listed by edits())
+    def version(self, sheet_name, worksheet_name):
+        with self._lock:
+            return self._generations.get(self._table(sheet_name, worksheet_name), 0)
+
+    # Cells updated within the current version, as (sheet row, column name)
+    def edits(self, sheet_name, worksheet_name):
+        with self._lock:
+            return tuple(self._edits.get(self._table(sheet_name, worksheet_name), ()))
+
+    def refresh(self, sheet_name=None, worksheet_name=None):
+        pass
+
+    def stats(self):
+        with self._lock:
+            tables = [row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            return {
+                "path": self.path,
+                "rows": {
+                    name: self._conn.execute(f"SELECT COUNT(*) FROM {self._quote(name)}").fetchone()[0]
+                    for name in tables
+                },
+            }
+
+
+# Local store as the read path, Google Sheets as the system of record. Writes
+# go to the sheet first and then to the local copy; a background thread keeps
+# the local copy in step with changes made elsewhere.
+class MirroredBackend:
+    name = "mirrored"
+    indexed = True
+
+    def __init__(self, local, remote, worksheets, reconcile_interval=DEFAULT_RECONCILE_INTERVAL):
+        self.local = local
+        self.remote = remote
+        self.worksheets = list(worksheets)  # (sheet_name, worksheet_name, incremental)
+        self.reconcile_interval = reconcile_interval
+        self.last_sync = None
+        self.last_error = None
+        self._last_reconcile = None
+        self._sync_lock = threading.Lock()
+        self._thread = None
+        self._ready = threading.Event()
+
+    # Until the first sync is done, reads are served from what the local store
+    # already has (e.g. from before a restart); only an empty store waits for it
+    def _wait_for_data(self, sheet_name, worksheet_name):
+        if self._thread is not None and not self._ready.is_set() and not self.local.row_count(sheet_name, worksheet_name):
+            self._ready.wait()
+
+    def load(self, sheet_name, worksheet_name, incremental=False):
+        self._wait_for_data(sheet_name, worksheet_name)
+        return self.local.load(sheet_name, worksheet_name)
+
+    def query(self, sheet_name, worksheet_name, start_date=None, end_date=None, open_only=False, incremental=False):
+        self._wait_for_data(sheet_name, worksheet_name)
+        return self.local.query(sheet_name, worksheet_name, start_date, end_date, open_only)
+
+    # Under the sync lock: a sync between the two writes would pull the new
+    # rows from the sheet, and the local append would then add them again
+    def append(self, sheet_name, worksheet_name, rows):
+        with self._sync_lock:
+            self.remote.append(sheet_name, worksheet_name, rows)
+            self.local.append(sheet_name, worksheet_name, rows)
+
+    def update_row(self, sheet_name, worksheet_name, row, fields, match=None):
+        self.remote.update_row(sheet_name, worksheet_name, row, fields, match=match)
+        self.local.update_row(sheet_name, worksheet_name, row, fields)
+
+    # Pull every mirrored worksheet (or only the given (sheet_name,
+    # worksheet_name) pairs) into the local store. Append-only worksheets only
+    # copy new rows, except on a full reconcile, which is due every
+    # reconcile_interval seconds and done by a sync of everything.
+    def sync(self, full=False, worksheets=None):
+        with self._sync_lock:
+            now = time.monotonic()
+            full = full or (worksheets is None and (self._last_reconcile is None
+                                                    or now - self._last_reconcile >= self.reconcile_interval))
+            for sheet_name, worksheet_name, incremental in self.worksheets:
+                if worksheets is not None and (sheet_name, worksheet_name) not in worksheets:
+                    continue
+                data = self.remote.load(sheet_name, worksheet_name, incremental=incremental)
+                if incremental and not full:
+                    self.local.extend(sheet_name, worksheet_name, data)
+                else:
+                    self.local.replace(sheet_name, worksheet_name, data)
+            if full and worksheets is None:
+                self._last_reconcile = now
+            self.last_sync = time.time()
+
+    def _run(self, interval):
+        full = True
+        while True:
+            try:
+                self.sync(full=full)
+                self.last_error = None
+            except Exception as e:  # keep syncing after transient API errors
+                self.last_error = str(e)
+            finally:
+                self._ready.set()
+            full = False
+            time.sleep(interval)
+
+    # Sync in a daemon thread: a full sync right away, then every interval
+    # seconds. Returns at once, so startup doesn't wait on Google Sheets.
+    def start(self, interval=DEFAULT_SYNC_INTERVAL):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True, name="sheets-sync")
+            self._thread.start()
+
+    # Looked up in the sheet, which appends reach first
+    def find_keys(self, sheet_name, worksheet_name, keys):
+        return self.remote.find_keys(sheet_name, worksheet_name, keys)
+
+    def version(self, sheet_name, worksheet_name):
+        return self.local.version(sheet_name, worksheet_name)
+
+    def edits(self, sheet_name, worksheet_name):
+        return self.local.edits(sheet_name, worksheet_name)
+
+    def row_count(self, sheet_name, worksheet_name):
+        return self.local.row_count(sheet_name, worksheet_name)
+
+    def refresh(self, sheet_name=None, worksheet_name=None):
+        self.remote.refresh(sheet_name, worksheet_name)
+        self.sync(full=True)
+
+    def stats(self):
+        stats = dict(self.remote.stats())
+        stats["last_sync"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.last_sync)) if self.last_sync else None
+        stats["last_sync_error"] = self.last_error
+        stats["local"] = self.local.stats()
+        return stats
@@ -1,71 +1,342 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
+import functools
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime, date
 import pytz  # Timezone handling
-import uuid  # For generating unique keys
-import matplotlib.pyplot as plt
+from sheets import WorksheetCache, DEFAULT_CACHE_TTL, DEFAULT_RECONCILE_INTERVAL, DEFAULT_TAIL_ROWS
+from watcher import ChangeWatcher, DEFAULT_POLL_INTERVAL, DEFAULT_LIVE_REFRESH_INTERVAL
+from storage import SheetsBackend, SQLiteBackend, MirroredBackend, DEFAULT_DB_PATH, DEFAULT_SYNC_INTERVAL, filter_rows
+from write_queue import WriteQueue, DEFAULT_QUEUE_PATH, DEFAULT_MAX_BATCH
+from importer import import_downtime, DEFAULT_CHUNK_SIZE
+from rollups import DowntimeRollup, pareto_series, pareto_top
+from reliability import DEFAULT_OPERATING_HOURS, DEFAULT_WINDOWS, RELIABILITY_DIMENSIONS, ReliabilityIndex
+from analytics import HIGH_RESOLUTION_COLUMNS, downtime_report, downtime_statistics
+from browse import search_rows, open_first, page_count, page_rows, row_labels, DEFAULT_PAGE_SIZE
+from charts import ChartCache, chart_key, pareto_spec, pareto_png, DEFAULT_CHART_CACHE_SIZE, DEFAULT_PARETO_TOP_N
+from schema import TypedDowntime, normalize_downtime
+from keys import KeyIndex, key_text, new_key
+from sheets import StaleRowError
+from priority import priority_scores, focus_split, PRIORITY_WEIGHTS, DEFAULT_PRIORITY_WEIGHT, DUE_DATE_THRESHOLDS
+from instrumentation import Recorder, InstrumentedClient, ApiTotals, activate, export_json, export_csv, DEFAULT_HISTORY
 
 
 # Define the scope
 scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
 
-# Load credentials from Streamlit Secrets
-credentials = Credentials.from_service_account_info(st.secrets["google_sheets"], scopes=scope)
-
-# Authorize gspread
-client = gspread.authorize(credentials)
+# Worksheets kept in the local store when storage_backend = "sqlite"
+# (sheet name, worksheet name, append-only)
+MIRRORED_WORKSHEETS = [
+    ("Project Management", "Downtime Issues", True),
+    ("Project Management", "KPI Dashboard", False),
+    ("Project Management", "Personal Productivity", False),
+]
+
+# Columns of a new, empty worksheet (the local store starts out empty)
+DOWNTIME_COLUMNS = ["Key", "Date", "Time", "Process Name", "Downtime Reason", "Action Taken", "Root Cause",
+                    "Time to Resolve (Minutes)", "Resolved (Y/N)", "Status", "Resolution Time"]
+PRODUCTIVITY_COLUMNS = ["Task Name", "Priority", "Due Date", "Status", "Actual Close Date"]
+
+# Read an optional setting from Streamlit Secrets (also works with no secrets file)
+def get_setting(name, default=None):
+    try:
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        return default
 
 # Set timezone to EST (Eastern Standard Time)
 est = pytz.timezone("US/Eastern")
 
-# Append data to Google Sheets
+# Time a rerun section by section, along with every Sheets API call it makes
+def start_recorder():
+    st.session_state.rerun_count = st.session_state.get("rerun_count", 0) + 1
+    rerun_recorder = Recorder(st.session_state.rerun_count)
+    activate(rerun_recorder)
+    return rerun_recorder
+
+# Close a rerun's timings and keep the last few for the performance panel
+def finish_recorder(rerun_recorder):
+    rerun_recorder.finish()
+    st.session_state.reruns = (st.session_state.get("reruns", []) + [rerun_recorder])[-DEFAULT_HISTORY:]
+
+recorder = start_recorder()
+recorder.begin("startup")
+
+# App title (drawn before anything slow, so a cold start never shows a blank page)
+st.title("Operations Management Assistant")
+
+# Sheets API call totals of this server process (all sessions and threads)
+@st.cache_resource
+def get_api_totals():
+    return ApiTotals()
+
+# Authorized gspread client (one per server process). Created on first sheet
+# access, not at startup: the backends are given this function, not a client.
+# With the demo_rows setting an in-process fake sheet of that many generated
+# downtime rows is used instead, so the app runs without a Google account.
+@st.cache_resource
+def get_client():
+    demo_rows = get_setting("demo_rows")
+    if demo_rows:
+        from benchmarks.fake_gspread import demo_client
+        return InstrumentedClient(demo_client(int(demo_rows), latency=get_setting("demo_latency", 0.0)),
+                                  get_api_totals())
+    import gspread
+    from google.oauth2.service_account import Credentials
+    # Load credentials from Streamlit Secrets
+    credentials = Credentials.from_service_account_info(st.secrets["google_sheets"], scopes=scope)
+    # Authorize gspread (wrapped so API calls show up in the performance panel)
+    return InstrumentedClient(gspread.authorize(credentials), get_api_totals())
+
+# Storage backend shared by all sessions, picked with the storage_backend setting:
+#   "sheets" - read and write Google Sheets directly (through the worksheet cache)
+#   "sqlite" - read from a local SQLite copy kept in sync with Google Sheets
+#   "local"  - local SQLite only, no Google credentials needed
+@st.cache_resource
+def get_backend():
+    mode = get_setting("storage_backend", "sheets")
+    db_path = get_setting("local_db_path", DEFAULT_DB_PATH)
+    if mode == "local":
+        return SQLiteBackend(db_path)
+
+    reconcile_interval = get_setting("sheet_reconcile_interval", DEFAULT_RECONCILE_INTERVAL)
+    sheets_backend = SheetsBackend(get_client, WorksheetCache(ttl=get_setting("sheet_cache_ttl", DEFAULT_CACHE_TTL)),
+                                   reconcile_interval=reconcile_interval)
+    if mode == "sqlite":
+        backend = MirroredBackend(SQLiteBackend(db_path), sheets_backend, MIRRORED_WORKSHEETS,
+                                  reconcile_interval=reconcile_interval)
+        backend.start(get_setting("sync_interval", DEFAULT_SYNC_INTERVAL))
+        return backend
+    return sheets_backend
+
+backend = get_backend()
+
+# Watches the sheets for changes made outside this app (one watcher per server
+# process, polling cheap signals); nothing to watch in local mode
+@st.cache_resource
+def get_change_watcher():
+    interval = get_setting("change_poll_interval", DEFAULT_POLL_INTERVAL)
+    if isinstance(backend, SQLiteBackend) or not interval:
+        return None
+    mirrored = isinstance(backend, MirroredBackend)
+    watcher = ChangeWatcher(backend.remote if mirrored else backend,
+                            MIRRORED_WORKSHEETS,
+                            tail_rows=get_setting("change_tail_rows", DEFAULT_TAIL_ROWS),
+                            on_change=(lambda changed: backend.sync(worksheets=changed)) if mirrored else None)
+    watcher.start(interval)
+    return watcher
+
+change_watcher = get_change_watcher()
+
+# Durable write-behind queue for new rows, written out by a background thread
+@st.cache_resource
+def get_write_queue():
+    queue = WriteQueue(backend, path=get_setting("write_queue_path", DEFAULT_QUEUE_PATH),
+                       max_batch=get_setting("write_batch_size", DEFAULT_MAX_BATCH))
+    queue.start()
+    return queue
+
+write_queue = get_write_queue()
+
+# Typed downtime frame shared by all sessions, parsed once and extended as rows are appended
+@st.cache_resource
+def get_typed_downtime():
+    return TypedDowntime()
+
+# Daily downtime aggregates shared by all sessions, extended as rows are appended
+@st.cache_resource
+def get_downtime_rollup():
+    return DowntimeRollup()
+
+# MTTR/MTBF/availability arrays shared by all sessions, extended as rows are appended
+@st.cache_resource
+def get_reliability_index():
+    return ReliabilityIndex(operating_hours=get_setting("operating_hours_per_day", DEFAULT_OPERATING_HOURS))
+
+# Rendered Pareto charts shared by all sessions, keyed on the data they show
+@st.cache_resource
+def get_chart_cache():
+    return ChartCache(get_setting("chart_cache_size", DEFAULT_CHART_CACHE_SIZE))
+
+# Downtime Key -> sheet row index shared by all sessions
+@st.cache_resource
+def get_downtime_keys():
+    return KeyIndex("Key")
+
+# The *_google_sheets helpers below go through the configured storage backend
+
+# Append data to Google Sheets. Rows are saved to the local write queue right
+# away and sent in batches in the background, with retries on quota/API errors.
 def append_to_google_sheets(data, sheet_name="Project Management", worksheet_name="Personal Productivity"):
-    try:
-        spreadsheet = client.open(sheet_name)
-        worksheet = spreadsheet.worksheet(worksheet_name)
-        data_as_list = data.values.tolist()
-        worksheet.append_rows(data_as_list, table_range="A1")
-        st.success("Data appended to Google Sheets!")
-    except gspread.exceptions.SpreadsheetNotFound:
+    write_queue.enqueue(sheet_name, worksheet_name, data)
+    st.success("Data saved! It will be written to Google Sheets in the background.")
+
+# Show a Google Sheets error to the user; False if e is not one. gspread is
+# only imported here, once an error has actually happened.
+def show_sheets_error(e, sheet_name):
+    import gspread
+    if isinstance(e, gspread.exceptions.SpreadsheetNotFound):
         st.error(f"Spreadsheet '{sheet_name}' not found. Ensure it exists and is shared with the service account.")
+    elif isinstance(e, gspread.exceptions.APIError):
+        st.error(f"Google Sheets API error: {str(e)}. Please check access permissions and API quota.")
+    else:
+        return False
+    return True
 
-# Load data from Google Sheets
-def load_from_google_sheets(sheet_name="Project Management", worksheet_name="Personal Productivity"):
+# Update fields of one row in Google Sheets with a single batched request.
+# match ({header: value}) is checked on the row first; StaleRowError is raised
+# if the row holds something else now.
+def update_in_google_sheets(row, fields, sheet_name="Project Management", worksheet_name="Downtime Issues", match=None):
     try:
-        spreadsheet = client.open(sheet_name)
-        worksheet = spreadsheet.worksheet(worksheet_name)
-        data = pd.DataFrame(worksheet.get_all_records())
-        return data
-    except gspread.exceptions.SpreadsheetNotFound:
-        st.error(f"Spreadsheet '{sheet_name}' not found. Ensure it exists and is shared with the service account.")
+        backend.update_row(sheet_name, worksheet_name, row, fields, match=match)
+        return True
+    except StaleRowError:
+        raise
+    except ValueError as e:
+        st.error(str(e))
+    except Exception as e:
+        if not show_sheets_error(e, sheet_name):
+            raise
+    return False
+
+# Load "Downtime Issues" and bring the shared typed frame, rollup and key index
+# up to date (typed once: categoricals, parsed Date and minutes; treat as read-only)
+def load_downtime():
+    data = load_from_google_sheets("Project Management", "Downtime Issues", incremental=True)
+    if data.empty:
+        data = data.reindex(columns=DOWNTIME_COLUMNS)
+    version = backend.version("Project Management", "Downtime Issues")
+    edits = backend.edits("Project Management", "Downtime Issues")
+    data = get_typed_downtime().sync(data, version, edits)
+    get_downtime_rollup().sync(data, version, edits)
+    get_downtime_keys().sync(data, version, edits)
+    return data
+
+# Update a downtime entry by Key. The row comes from the key index and is
+# checked before writing; if the sheet changed underneath us (rows added,
+# deleted or sorted elsewhere) it is reloaded and the update retried once.
+def update_downtime_entry(key, fields):
+    for attempt in range(2):
+        row_index = get_downtime_keys().row(key)
+        if row_index is None:
+            break
+        try:
+            return update_in_google_sheets(row_index, fields, "Project Management", "Downtime Issues", match={"Key": key})
+        except StaleRowError:
+            backend.refresh("Project Management", "Downtime Issues")
+            load_downtime()
+    st.error(f"Downtime entry with Key {key} was not found. Please refresh the data and try again.")
+    return False
+
+# Load data from Google Sheets (served from the shared cache while fresh).
+# incremental=True is for append-only logs: only newly appended rows are
+# fetched, with a periodic full reconcile to pick up in-place edits.
+def load_from_google_sheets(sheet_name="Project Management", worksheet_name="Personal Productivity", incremental=False):
+    try:
+        return backend.load(sheet_name, worksheet_name, incremental=incremental)
+    except Exception as e:
+        if not show_sheets_error(e, sheet_name):
+            raise
         return pd.DataFrame()
-    except gspread.exceptions.APIError as e:
-        st.error(f"Google Sheets API error: {str(e)}. Please check access permissions and API quota.")
+
+# Load only the rows in a date range (and optionally only open issues).
+# Uses the local store's indexes when one is configured.
+def query_google_sheets(sheet_name="Project Management", worksheet_name="Downtime Issues", start_date=None, end_date=None,
+                        open_only=False, incremental=False):
+    try:
+        return backend.query(sheet_name, worksheet_name, start_date=start_date, end_date=end_date,
+                             open_only=open_only, incremental=incremental)
+    except Exception as e:
+        if not show_sheets_error(e, sheet_name):
+            raise
         return pd.DataFrame()
 
 # Initialize session state
 if "data" not in st.session_state:
     st.session_state.data = pd.DataFrame(columns=["Date", "Time", "Process Name", "Downtime Reason", "Action Taken", "Root Cause", "Time to Resolve (Minutes)", "Resolved (Y/N)"])
 
-# App title
-st.title("Operations Management Assistant")
-
-# Create tabs
-tab1, tab2, tab3 = st.tabs(["Downtime Issues", "KPI Dashboard", "Personal Productivity"])
-
-# Load Downtime Data
-downtime_data = load_from_google_sheets("Project Management", "Downtime Issues")
+# Storage / cache counters
+with st.sidebar.expander("Data Source"):
+    st.caption(f"Storage backend: {backend.name}")
+    st.json(backend.stats())
+    if change_watcher is not None:
+        st.caption("Change detection")
+        st.json(change_watcher.stats())
+    if st.button("Refresh Data", key="refresh_sheet_cache"):
+        backend.refresh()
+        st.rerun()
+
+# Rows submitted but not yet written to the sheet
+queue_counts = write_queue.counts()
+if queue_counts["pending"] or queue_counts["failed"]:
+    with st.sidebar.expander(f"Pending Writes ({queue_counts['pending']} pending, {queue_counts['failed']} failed)",
+                             expanded=bool(queue_counts["failed"])):
+        st.dataframe(write_queue.pending(limit=100))
+        if queue_counts["failed"] and st.button("Retry Failed Writes", key="retry_failed_writes"):
+            write_queue.retry_failed()
+            st.rerun()
+
+# Columns searched by the downtime issue browsers
+DOWNTIME_SEARCH_COLUMNS = ["Key", "Process Name", "Downtime Reason", "Root Cause", "Action Taken", "Status"]
+
+# Search box and page selector over a frame. Searching, ordering (open rows
+# first) and slicing happen here on the server; only the returned page of
+# rows is meant to be sent to the browser.
+def browse_page(data, key, search_columns):
+    query = st.text_input("Search", key=f"{key}_search", placeholder="Type to filter...")
+    rows = open_first(search_rows(data, query, search_columns))
+    page_size = int(get_setting("page_size", DEFAULT_PAGE_SIZE))
+    pages = page_count(len(rows), page_size)
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    first = (page - 1) * page_size
+    st.caption(f"Page {page} of {pages}: rows {first + 1 if len(rows) else 0}–{min(first + page_size, len(rows))} of {len(rows)}")
+    return page_rows(rows, page, page_size)
+
+# Searchable, paginated picker; returns the index of the selected row (None when nothing matches)
+def pick_row(data, key, label, label_columns, search_columns):
+    rows = browse_page(data, key, search_columns)
+    if rows.empty:
+        st.info("No matching entries.")
+        return None
+    labels = row_labels(rows, label_columns)
+    return st.selectbox(label, rows.index, format_func=labels.get, key=f"{key}_select")
+
+# Rerun just the current fragment, or the whole script when the fragment is
+# running as part of a full run (Streamlit only allows the fragment scope in
+# a fragment rerun)
+def rerun_fragment():
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+# Run a view with the recorder of the current rerun. A widget change inside a
+# fragment reruns only that fragment, without the rest of the script; such a
+# rerun gets a recorder of its own.
+def recorded(view):
+    @functools.wraps(view)
+    def run():
+        if recorder.seconds is None:
+            return view(recorder)
+        fragment_recorder = start_recorder()
+        try:
+            return view(fragment_recorder)
+        finally:
+            finish_recorder(fragment_recorder)
+    return run
 
 
 ##################################################################################################################
 ##################################################################################################################
 ### Downtime Tracking ###
 ##################################################################################################################
-with tab1:
-
-# Enter Downtime Issue
+@st.fragment
+@recorded
+def downtime_tab(recorder):
+# Enter Downtime Issue (drawn before the data loads, so it can be used right away)
+    recorder.begin("entry")
     st.header("Enter Downtime Issue")
     with st.form("data_entry_form", clear_on_submit=True):
         today_date = st.date_input("Date", value=date.today())
@@ -90,7 +361,8 @@ with tab1:
         submitted = st.form_submit_button("Add Data")
     
         if submitted:
-            key = len(downtime_data) + 1  # Use index as the key
+            # Random key, so entries submitted at the same time from different tablets never clash
+            key = new_key(get_downtime_keys())
             new_row = pd.DataFrame([{
                 "Key": key, 
                 "Date": today_date.strftime("%Y-%m-%d"), 
@@ -104,16 +376,56 @@ with tab1:
                 "Status": status,
                 "Resolution Time": resolution_time
             }])
-    
-            # Use pd.concat() instead of append() to avoid AttributeError
-            downtime_data = pd.concat([downtime_data, new_row], ignore_index=True)
             append_to_google_sheets(new_row, "Project Management", "Downtime Issues")
+
+    # Load Downtime Data
+    recorder.begin("load")
+    with st.spinner("Loading downtime data..."):
+        downtime_data = load_downtime()
+    downtime_rollup = get_downtime_rollup()
+    downtime_keys = get_downtime_keys()
+    # A submitted row is only written by the queue a moment later, so it isn't
+    # listed (or offered for updates) until then: the Pending Writes panel
+    # shows it meanwhile, and live refresh redraws the page once it's in
+
+    # Bulk import of MES/PLC CSV exports, streamed in chunks into the write queue
+    recorder.begin("import")
+    with st.expander("Import Downtime from CSV"):
+        st.caption("Columns are matched by name (e.g. Date or Start, Line or Process Name, Reason, Duration). "
+                   "Rows already in the sheet or waiting to be written are skipped.")
+        uploaded = st.file_uploader("CSV export", type=["csv"], key="downtime_import_file")
+        if uploaded is not None and st.button("Import", key="downtime_import"):
+            progress_bar = st.progress(0.0, text="Importing...")
+
+            def show_progress(fraction, result):
+                progress_bar.progress(fraction or 0.0, text=f"{result.rows_read} rows read, {result.imported} queued")
+
+            try:
+                result = import_downtime(
+                    uploaded, lambda rows: write_queue.enqueue("Project Management", "Downtime Issues", rows),
+                    existing=downtime_data, existing_keys=downtime_keys,
+                    queued=write_queue.queued_rows("Project Management", "Downtime Issues"),
+                    chunksize=int(get_setting("import_chunk_size", DEFAULT_CHUNK_SIZE)),
+                    progress=show_progress, total_bytes=uploaded.size,
+                )
+            except (ValueError, pd.errors.ParserError, UnicodeDecodeError) as e:
+                st.error(f"Could not import the file: {e}")
+            else:
+                progress_bar.progress(1.0, text="Done")
+                st.success(f"{result.imported} rows queued for Google Sheets ({result.duplicates} duplicates "
+                           f"skipped, {result.rejected} rejected).")
+                if result.unmapped_columns:
+                    st.caption(f"Ignored columns: {', '.join(result.unmapped_columns)}")
+                if result.rejected:
+                    st.warning("Rejected rows (first 100):")
+                    st.dataframe(result.rejected_frame())
 ###################################################################################
 
 ##################################################################################################################
 ##################################################################################################################
 
     # Display Table with Filters
+    recorder.begin("filter")
     st.subheader("Downtime Issues Table")
     
     # Checkbox to show only open issues
@@ -124,132 +436,124 @@ with tab1:
     start_date = st.date_input("Start Date", value=date.today(), key="start_date_filter")
     end_date = st.date_input("End Date", value=date.today(), key="end_date_filter")
     
-    # Apply filters to downtime data
-    filtered_downtime = downtime_data.copy()
-    
-    # Filter open issues if checkbox is selected
-    if show_open_only:
-        filtered_downtime = filtered_downtime[filtered_downtime["Status"] != "Closed"]
-    
-    # Apply date range filter
-    filtered_downtime["Date"] = pd.to_datetime(filtered_downtime["Date"], errors='coerce')
-    filtered_downtime = filtered_downtime[
-        (filtered_downtime["Date"] >= pd.to_datetime(start_date)) & 
-        (filtered_downtime["Date"] <= pd.to_datetime(end_date))
-    ]
+    # Apply filters to downtime data (open issues + date range): on the local
+    # store's indexes when there is one, otherwise on the typed frame in memory
+    if backend.indexed:
+        filtered_downtime = query_google_sheets("Project Management", "Downtime Issues", start_date=start_date,
+                                                end_date=end_date, open_only=show_open_only, incremental=True)
+        if filtered_downtime.empty:
+            filtered_downtime = filtered_downtime.reindex(columns=DOWNTIME_COLUMNS)
+        filtered_downtime = normalize_downtime(filtered_downtime)
+    else:
+        filtered_downtime = filter_rows(downtime_data, start_date, end_date, show_open_only)
     
-    # Display filtered downtime table
-    st.dataframe(filtered_downtime)
+    # Display filtered downtime table, one page at a time
+    st.dataframe(browse_page(filtered_downtime, "downtime_table", DOWNTIME_SEARCH_COLUMNS))
     ##################################################################################################################
     ##################################################################################################################
     
     # 📊 Downtime Statistics
+    recorder.begin("statistics")
     st.subheader("📈 Downtime Statistics")
-    total_issues = len(filtered_downtime)
-    open_issues = len(filtered_downtime[filtered_downtime["Status"] != "Closed"])
-    closed_issues = total_issues - open_issues
-    avg_resolution_time = filtered_downtime["Time to Resolve (Minutes)"].mean()
+    statistics = downtime_statistics(filtered_downtime)
     
-    st.write(f"**Total Issues:** {total_issues}")
-    st.write(f"**Open Issues:** {open_issues}")
-    st.write(f"**Closed Issues:** {closed_issues}")
-    st.write(f"**Avg Resolution Time:** {avg_resolution_time:.2f} minutes")
+    st.write(f"**Total Issues:** {statistics['total_issues']}")
+    st.write(f"**Open Issues:** {statistics['open_issues']}")
+    st.write(f"**Closed Issues:** {statistics['closed_issues']}")
+    st.write(f"**Avg Resolution Time:** {statistics['avg_resolution_time']:.2f} minutes")
     
     
     # Update Downtime Status with Custom Resolution Time
+    recorder.begin("update")
     st.subheader("Update Downtime Status")
     if not downtime_data.empty:
-        # Format options as "Key - Process Name"
-        downtime_options = [f"{row['Key']} - {row['Process Name']}" for _, row in downtime_data.iterrows()]
-        selected_downtime = st.selectbox("Select Downtime Issue to Update (Key - Process Name)", 
-                                         downtime_options, key="downtime_selectbox")
+        # Options labelled "Key - Process Name"
+        selected_index = pick_row(downtime_data, "downtime_status", "Select Downtime Issue to Update (Key - Process Name)",
+                                  ["Key", "Process Name"], DOWNTIME_SEARCH_COLUMNS)
     
         new_status = st.selectbox("Update Status", ["Open", "In Progress", "Closed"], key="downtime_status_selectbox")
         
         # Allow user to manually update resolution time
         custom_resolution_time = st.text_input("Custom Resolution Time (YYYY-MM-DD HH:MM:SS)", value="")
     
-        if st.button("Update Downtime Status"):
-            # Extract Key from the selection
-            selected_key = int(selected_downtime.split(" - ")[0])
-    
-            spreadsheet = client.open("Project Management")
-            worksheet = spreadsheet.worksheet("Downtime Issues")
+        if st.button("Update Downtime Status") and selected_index is not None:
+            selected_key = key_text(downtime_data.at[selected_index, "Key"])
+            selected_downtime = f"{selected_key} - {downtime_data.at[selected_index, 'Process Name']}"
     
-            # Find the row index using the Key
-            row_index = selected_key + 1  # Adjust for 1-based index in Google Sheets
-    
-            worksheet.update_cell(row_index, worksheet.find("Status").col, new_status)
+            status_fields = {"Status": new_status}
     
             # If status is marked as "Closed", update the resolution time
             if new_status == "Closed":
                 resolution_time = custom_resolution_time if custom_resolution_time else datetime.now(est).strftime("%Y-%m-%d %H:%M:%S")
-                worksheet.update_cell(row_index, worksheet.find("Resolution Time").col, resolution_time)
+                status_fields["Resolution Time"] = resolution_time
             
-            st.success(f"Status updated for Downtime Issue '{selected_downtime}' to '{new_status}' with Resolution Time '{resolution_time}'!")
+            if update_downtime_entry(selected_key, status_fields):
+                st.success(f"Status updated for Downtime Issue '{selected_downtime}' to '{new_status}' with Resolution Time '{resolution_time}'!")
 
-            # Edit Full Downtime Entry (Mobile-Friendly with Expander)
-            st.subheader("✏️ Edit Downtime Entry")
-            
-            if not downtime_data.empty:
-                selected_entry = st.selectbox(
-                    "Select Downtime Entry to Edit", 
-                    [f"{row['Key']} - {row['Process Name']}" for _, row in downtime_data.iterrows()]
-                )
-            
-                selected_key = int(selected_entry.split(" - ")[0])
-                row_match = downtime_data[downtime_data["Key"] == selected_key]
-            
-                if row_match.empty:
-                    st.warning("Selected entry not found. Please refresh or check the data.")
-                else:
-                    row_data = row_match.iloc[0]
-            
-                    with st.expander("Edit Selected Entry"):
-                        with st.form("edit_downtime_form"):
-                            date_edit = st.date_input("Date", value=pd.to_datetime(row_data["Date"]))
-                            time_edit = st.text_input("Time (HH:MM:SS)", value=row_data["Time"])
-                            process_edit = st.text_input("Process Name", value=row_data["Process Name"])
-                            reason_edit = st.text_input("Downtime Reason", value=row_data["Downtime Reason"])
-                            action_edit = st.text_input("Action Taken", value=row_data["Action Taken"])
-                            root_edit = st.text_input("Root Cause", value=row_data["Root Cause"])
-                            minutes_edit = st.number_input(
-                                "Time to Resolve (Minutes)", min_value=0, step=1,
-                                value=int(row_data["Time to Resolve (Minutes)"])
-                            )
-                            resolved_edit = st.selectbox(
-                                "Resolved?", ["Y", "N"],
-                                index=0 if row_data["Resolved (Y/N)"] == "Y" else 1
-                            )
-                            status_edit = st.selectbox(
-                                "Status", ["Open", "In Progress", "Closed"],
-                                index=["Open", "In Progress", "Closed"].index(row_data["Status"])
-                            )
-                            resolution_time_edit = st.text_input(
-                                "Resolution Time", value=row_data.get("Resolution Time", "")
-                            )
-            
-                            update_btn = st.form_submit_button("Update Entry")
-            
-                            if update_btn:
-                                with st.spinner("Updating entry..."):
-                                    spreadsheet = client.open("Project Management")
-                                    worksheet = spreadsheet.worksheet("Downtime Issues")
-                                    row_index = selected_key + 1  # Adjust for 1-based index and header
-            
-                                    worksheet.update_cell(row_index, worksheet.find("Date").col, date_edit.strftime("%Y-%m-%d"))
-                                    worksheet.update_cell(row_index, worksheet.find("Time").col, time_edit)
-                                    worksheet.update_cell(row_index, worksheet.find("Process Name").col, process_edit)
-                                    worksheet.update_cell(row_index, worksheet.find("Downtime Reason").col, reason_edit)
-                                    worksheet.update_cell(row_index, worksheet.find("Action Taken").col, action_edit)
-                                    worksheet.update_cell(row_index, worksheet.find("Root Cause").col, root_edit)
-                                    worksheet.update_cell(row_index, worksheet.find("Time to Resolve (Minutes)").col, str(minutes_edit))
-                                    worksheet.update_cell(row_index, worksheet.find("Resolved (Y/N)").col, resolved_edit)
-                                    worksheet.update_cell(row_index, worksheet.find("Status").col, status_edit)
-                                    worksheet.update_cell(row_index, worksheet.find("Resolution Time").col, resolution_time_edit)
-            
-                                st.success(f"Downtime entry for Key {selected_key} updated successfully!")
-                                st.experimental_rerun()
+    # Edit Full Downtime Entry (Mobile-Friendly with Expander)
+    st.subheader("✏️ Edit Downtime Entry")
+    
+    selected_index = None
+    if not downtime_data.empty:
+        selected_index = pick_row(downtime_data, "downtime_edit", "Select Downtime Entry to Edit",
+                                  ["Key", "Process Name"], DOWNTIME_SEARCH_COLUMNS)
+
+    if selected_index is not None:
+        selected_key = key_text(downtime_data.at[selected_index, "Key"])
+        row_index = downtime_keys.row(selected_key)
+        row_data = downtime_data.iloc[row_index - 2] if row_index is not None and row_index - 2 < len(downtime_data) else None
+    
+        if row_data is None or key_text(row_data["Key"]) != selected_key:
+            st.warning("Selected entry not found. Please refresh or check the data.")
+        else:
+            if selected_key in downtime_keys.duplicates:
+                st.warning(f"Key {selected_key} is used by more than one row; the last one will be updated.")
+    
+            with st.expander("Edit Selected Entry"):
+                with st.form("edit_downtime_form"):
+                    date_edit = st.date_input("Date", value=pd.to_datetime(row_data["Date"]))
+                    time_edit = st.text_input("Time (HH:MM:SS)", value=row_data["Time"])
+                    process_edit = st.text_input("Process Name", value=row_data["Process Name"])
+                    reason_edit = st.text_input("Downtime Reason", value=row_data["Downtime Reason"])
+                    action_edit = st.text_input("Action Taken", value=row_data["Action Taken"])
+                    root_edit = st.text_input("Root Cause", value=row_data["Root Cause"])
+                    minutes_edit = st.number_input(
+                        "Time to Resolve (Minutes)", min_value=0, step=1,
+                        value=int(row_data["Time to Resolve (Minutes)"]) if pd.notna(row_data["Time to Resolve (Minutes)"]) else 0
+                    )
+                    resolved_edit = st.selectbox(
+                        "Resolved?", ["Y", "N"],
+                        index=0 if row_data["Resolved (Y/N)"] == "Y" else 1
+                    )
+                    status_edit = st.selectbox(
+                        "Status", ["Open", "In Progress", "Closed"],
+                        index=["Open", "In Progress", "Closed"].index(row_data["Status"])
+                    )
+                    resolution_time_edit = st.text_input(
+                        "Resolution Time", value=row_data.get("Resolution Time", "")
+                    )
+    
+                    update_btn = st.form_submit_button("Update Entry")
+    
+                    if update_btn:
+                        with st.spinner("Updating entry..."):
+                            # Write the whole row in one batched request
+                            updated = update_downtime_entry(selected_key, {
+                                "Date": date_edit.strftime("%Y-%m-%d"),
+                                "Time": time_edit,
+                                "Process Name": process_edit,
+                                "Downtime Reason": reason_edit,
+                                "Action Taken": action_edit,
+                                "Root Cause": root_edit,
+                                "Time to Resolve (Minutes)": str(minutes_edit),
+                                "Resolved (Y/N)": resolved_edit,
+                                "Status": status_edit,
+                                "Resolution Time": resolution_time_edit,
+                            })
+    
+                        if updated:
+                            st.success(f"Downtime entry for Key {selected_key} updated successfully!")
+                            rerun_fragment()
             
 
     ##################################################################################################################
@@ -258,138 +562,156 @@ with tab1:
     
     
     
-# 📊 Pareto Chart: Sorted by Total Downtime with Cumulative Line
-st.subheader("Pareto Chart of Downtime Reasons (Sorted by Total Downtime)")
-
-if not filtered_downtime.empty and "Downtime Reason" in filtered_downtime.columns:
-    pareto_data = (
-        filtered_downtime.groupby("Downtime Reason")["Time to Resolve (Minutes)"]
-        .sum()
-        .sort_values(ascending=False)
-    )
+    # 📊 Pareto Chart: Sorted by Total Downtime with Cumulative Line
+    recorder.begin("pareto")
+    st.subheader("Pareto Chart of Downtime Reasons (Sorted by Total Downtime)")
 
-    total_downtime = pareto_data.sum()
-
-    if pareto_data.empty or total_downtime == 0:
-        st.info("No downtime data available to display a Pareto chart.")
-    else:
-        cumulative_percentage = pareto_data.cumsum() / total_downtime * 100
+    if not filtered_downtime.empty and "Downtime Reason" in filtered_downtime.columns:
+        pareto_data = pareto_series(downtime_rollup, "Downtime Reason", start_date, end_date, open_only=show_open_only)
 
-        fig, ax1 = plt.subplots(figsize=(10, 5))
-        ax1.bar(pareto_data.index, pareto_data.values, alpha=0.6, label="Total Downtime (Minutes)")
-        ax1.set_ylabel("Total Downtime (Minutes)")
-        ax1.tick_params(axis="y")
-        ax1.set_xticklabels(pareto_data.index, rotation=45, ha="right")
+        total_downtime = pareto_data.sum()
 
-        ax2 = ax1.twinx()
-        ax2.plot(pareto_data.index, cumulative_percentage, marker="o", linestyle="-", color="red", label="Cumulative %")
-        ax2.set_ylabel("Cumulative Percentage (%)")
-        ax2.tick_params(axis="y")
-        ax2.set_ylim(0, 110)
+        if pareto_data.empty or total_downtime == 0:
+            st.info("No downtime data available to display a Pareto chart.")
+        else:
+            # Largest reasons only, the rest grouped as "Other" (0 shows every reason)
+            top_n = st.number_input("Reasons to show (the rest are grouped as Other, 0 = all)", min_value=0, step=1,
+                                    value=int(get_setting("pareto_top_n", DEFAULT_PARETO_TOP_N)), key="pareto_top_n")
+            pareto_data = pareto_top(pareto_data, top_n)
 
-        ax1.set_title("Pareto Chart of Downtime Reasons")
-        fig.tight_layout()
-        st.pyplot(fig)
+            # Drawn once per distinct set of bars, then served from the chart cache
+            title = "Pareto Chart of Downtime Reasons"
+            if get_setting("pareto_renderer", "vega") == "matplotlib":
+                png = get_chart_cache().get(chart_key(pareto_data, "png", title), lambda: pareto_png(pareto_data, title))
+                st.image(png)
+            else:
+                spec = get_chart_cache().get(chart_key(pareto_data, "vega", title), lambda: pareto_spec(pareto_data, title))
+                st.vega_lite_chart(spec, use_container_width=True)
 
     
-    # 📉 Downtime Issues & Insights
-    st.header("📉 Downtime Issues & Insights")
-    
-    # Display filtered downtime data
-    #st.subheader("Downtime Issues Table")
-    #st.dataframe(filtered_downtime)
-    
-    # 📊  Insights
-    st.subheader("💡 Data Insights")
-    
-    if not filtered_downtime.empty:
-        filtered_downtime["Date"] = pd.to_datetime(filtered_downtime["Date"], errors='coerce')
-        filtered_downtime["Time to Resolve (Minutes)"] = pd.to_numeric(filtered_downtime["Time to Resolve (Minutes)"], errors='coerce')
+        # 📉 Downtime Issues & Insights
+        recorder.begin("insights")
+        st.header("📉 Downtime Issues & Insights")
     
-        # 🚨 Identify Top 3 Frequent Root Causes
-        if "Root Cause" in filtered_downtime.columns:
-            root_cause_counts = filtered_downtime["Root Cause"].value_counts()
-            top_root_causes = root_cause_counts.head(3)
+        # Display filtered downtime data
+        #st.subheader("Downtime Issues Table")
+        #st.dataframe(filtered_downtime)
     
-            st.markdown("### 🔥 **Top 3 Root Causes**")
-            for cause, count in top_root_causes.items():
-                st.write(f"- **{cause}**: {count} occurrences")
+        # 📊  Insights
+        st.subheader("💡 Data Insights")
     
-        # ⚠️ Flag High-Resolution Time Issues
-        high_res_time_issues = filtered_downtime[filtered_downtime["Time to Resolve (Minutes)"] > filtered_downtime["Time to Resolve (Minutes)"].mean()]
-        
-        if not high_res_time_issues.empty:
-            st.markdown("### ⏳ **High-Resolution Time Downtime Issues**")
-            st.dataframe(high_res_time_issues[["Key", "Process Name", "Downtime Reason", "Time to Resolve (Minutes)"]])
-    
-        # 📈 Trend Analysis for Recurring Issues
-        downtime_trend = filtered_downtime.groupby(filtered_downtime["Date"].dt.to_period("M"))["Time to Resolve (Minutes)"].sum()
-        downtime_trend.index = downtime_trend.index.to_timestamp()
-        
-        st.subheader("📈 Downtime Trend Analysis")
-        st.line_chart(downtime_trend)
-    
-    # 🔍 Suggestions
-    st.subheader("🚀 Suggestions for Improvement")
+        if not filtered_downtime.empty:
+            # Same analysis the report CLI runs (analytics.py)
+            report = downtime_report(downtime_data, start_date, end_date, show_open_only,
+                                     filtered=filtered_downtime, rollup=downtime_rollup)
+
+            # 🚨 Identify Top 3 Frequent Root Causes
+            if "Root Cause" in filtered_downtime.columns:
+                st.markdown("### 🔥 **Top 3 Root Causes**")
+                for cause, count in report["top_root_causes"].items():
+                    st.write(f"- **{cause}**: {count} occurrences")
     
-    if not filtered_downtime.empty:
-        st.markdown("### 🛠 **Actionable Recommendations**")
+            # ⚠️ Flag High-Resolution Time Issues
+            if not report["high_resolution"].empty:
+                st.markdown("### ⏳ **High-Resolution Time Downtime Issues**")
+                st.dataframe(report["high_resolution"][HIGH_RESOLUTION_COLUMNS])
     
-        # 🛑 Preventive Maintenance for Top Causes
-        if not top_root_causes.empty:
-            for cause in top_root_causes.index:
-                st.write(f"- **Implement a Preventive Maintenance Plan for:** {cause}")
+            # 📈 Trend Analysis for Recurring Issues
+            st.subheader("📈 Downtime Trend Analysis")
+            st.line_chart(report["monthly_trend"])
     
-        # ⚙️ Training & SOP Adjustments
-        if len(top_root_causes) > 1:
-            st.write("- **Review standard operating procedures (SOPs)** for recurring downtime issues.")
-            st.write("- **Provide additional training** for operators on handling the most common issues.")
+        # 🔍 Suggestions
+        st.subheader("🚀 Suggestions for Improvement")
     
-        # ⏱ Reducing High-Resolution Time
-        if not high_res_time_issues.empty:
-            st.write("- **Investigate downtime issues with unusually high resolution times** and optimize response strategies.")
+        if not filtered_downtime.empty:
+            st.markdown("### 🛠 **Actionable Recommendations**")
+            for recommendation in report["recommendations"]:
+                st.write(f"- {recommendation}")
     
-        # ⚡ Urgent Action Alert
-        if filtered_downtime["Time to Resolve (Minutes)"].mean() > 30:
-            st.warning("⚠️ High average resolution time detected! Consider faster troubleshooting processes.")
+            # ⚡ Urgent Action Alert
+            if report["warning"]:
+                st.warning(report["warning"])
     
     
     
-    ######################################################################################3
+        ######################################################################################3
     
-    ##################################################################################################################
-    ##################################################################################################################
-    ##################################################################################################################
+        ##################################################################################################################
+        ##################################################################################################################
+        ##################################################################################################################
 
 ### KPI Dashboard ###
-with tab2:
+@st.fragment
+@recorded
+def kpi_tab(recorder):
+    recorder.begin("kpi")
     st.header("📊 KPI Dashboard")
-    kpi_data = load_from_google_sheets("Project Management", "KPI Dashboard")
+    with st.spinner("Loading KPI data..."):
+        kpi_data = load_from_google_sheets("Project Management", "KPI Dashboard")
     if not kpi_data.empty:
         st.dataframe(kpi_data)
         st.line_chart(kpi_data.set_index("Date"))
 
     # Dynamic KPI Calculations
+    with st.spinner("Loading downtime data..."):
+        downtime_data = load_downtime()
+    downtime_rollup = get_downtime_rollup()
     if not downtime_data.empty:
-        downtime_data["Time to Resolve (Minutes)"] = pd.to_numeric(downtime_data["Time to Resolve (Minutes)"], errors='coerce')
-        total_downtime = downtime_data["Time to Resolve (Minutes)"].sum()
-        avg_downtime = downtime_data["Time to Resolve (Minutes)"].mean()
+        downtime_totals = downtime_rollup.overall()
+        total_downtime = downtime_totals["minutes"]
+        avg_downtime = total_downtime / downtime_totals["timed"] if downtime_totals["timed"] else float("nan")
         st.subheader("Dynamic KPIs")
-        st.write(f"Total Downtime: {total_downtime} minutes")
+        st.write(f"Total Downtime: {total_downtime:g} minutes")
         st.write(f"Average Downtime: {avg_downtime:.2f} minutes")
 
         # Trend Analysis - Downtime Over Time
-        downtime_data["Date"] = pd.to_datetime(downtime_data["Date"], errors='coerce')
-        downtime_trend = downtime_data.groupby(downtime_data["Date"].dt.to_period("M"))["Time to Resolve (Minutes)"].sum()
-        downtime_trend.index = downtime_trend.index.to_timestamp()
+        downtime_trend = downtime_rollup.monthly()["minutes"]
         st.subheader("Downtime Trend Analysis")
         st.line_chart(downtime_trend)
 
+        # Reliability KPIs over the last 7/30 days of data, per process or reason
+        reliability = get_reliability_index()
+        reliability.sync(downtime_data, backend.version("Project Management", "Downtime Issues"),
+                         backend.edits("Project Management", "Downtime Issues"))
+        as_of = reliability.last_day()
+        if as_of is not None:
+            st.subheader("Reliability")
+            window = st.radio("Window", DEFAULT_WINDOWS, format_func=lambda days: f"Last {days} days",
+                              horizontal=True, key="reliability_window")
+            dimension = st.selectbox("Break down by", RELIABILITY_DIMENSIONS, key="reliability_dimension")
+            window_start = as_of - pd.Timedelta(days=window - 1)
+            st.caption(f"{window_start:%Y-%m-%d} to {as_of:%Y-%m-%d}")
+
+            overall = reliability.overall(window_start, as_of)
+            mttr, mtbf, availability, events = st.columns(4)
+            mttr.metric("MTTR", f"{overall['mttr_minutes']:.1f} min")
+            mtbf.metric("MTBF", f"{overall['mtbf_minutes'] / 60:.1f} h")
+            availability.metric("Availability", f"{overall['availability']:.1%}")
+            events.metric("Events", overall["events"])
+
+            kpis = reliability.kpis(dimension, window_start, as_of)
+            st.dataframe(kpis[kpis["events"] > 0].assign(mtbf_hours=lambda k: k["mtbf_minutes"] / 60)
+                         .drop(columns="mtbf_minutes")
+                         .style.format({"downtime_minutes": "{:,.0f}", "mttr_minutes": "{:.1f}",
+                                        "mtbf_hours": "{:.1f}", "availability": "{:.1%}"}))
+
+            # Rolling downtime of the largest values only, to keep the chart readable
+            st.markdown(f"**Rolling {window}-day downtime (minutes)**")
+            top = kpis.index[:10]
+            st.line_chart(reliability.rolling(dimension, window, values=top))
+
 
 ### Personal Productivity ###
-with tab3:
+@st.fragment
+@recorded
+def productivity_tab(recorder):
+    recorder.begin("productivity")
     st.header("🎯 Personal Productivity Tracker")
-    productivity_data = load_from_google_sheets("Project Management", "Personal Productivity")
+    with st.spinner("Loading tasks..."):
+        # The loaded frame is shared with other sessions; this view adds columns to it
+        productivity_data = load_from_google_sheets("Project Management", "Personal Productivity").copy()
+    if productivity_data.empty:
+        productivity_data = productivity_data.reindex(columns=PRODUCTIVITY_COLUMNS)
     
     # Assign unique keys if missing
     if "Key" not in productivity_data.columns:
@@ -412,32 +734,16 @@ with tab3:
         today = pd.to_datetime(date.today())
         productivity_data['Days Until Due'] = (productivity_data['Due Date'] - today).dt.days
 
-        def calculate_priority(row):
-            priority_score = 0
-            if row['Priority'] == 'High':
-                priority_score += 3
-            elif row['Priority'] == 'Medium':
-                priority_score += 2
-            else:
-                priority_score += 1
-
-            if row['Days Until Due'] <= 3:
-                priority_score += 3
-            elif row['Days Until Due'] <= 7:
-                priority_score += 2
-            elif row['Days Until Due'] <= 14:
-                priority_score += 1
-
-            return priority_score
-
-        productivity_data['Priority Score'] = productivity_data.apply(calculate_priority, axis=1)
-        sorted_tasks = productivity_data.sort_values(by='Priority Score', ascending=False)
-
-      #  high_value_tasks = sorted_tasks.head(int(len(sorted_tasks) * 0.2))  # Top 20%
-        low_value_tasks = sorted_tasks.tail(int(len(sorted_tasks) * 0.8))  # Bottom 80%
+        # Score every task at once (weights/thresholds configurable in secrets)
+        productivity_data['Priority Score'] = priority_scores(
+            productivity_data['Priority'], productivity_data['Days Until Due'],
+            weights=get_setting("priority_weights", PRIORITY_WEIGHTS),
+            default_weight=get_setting("default_priority_weight", DEFAULT_PRIORITY_WEIGHT),
+            thresholds=get_setting("due_date_thresholds", DUE_DATE_THRESHOLDS),
+        )
 
-        # High-Value Tasks (Only Open or In Progress)
-        high_value_tasks = sorted_tasks[(sorted_tasks["Status"].isin(["Open", "In Progress"]))].head(int(len(sorted_tasks) * 0.2))
+        # High-Value Tasks (Only Open or In Progress, top 20%) and Low-Value Tasks (bottom 80%)
+        high_value_tasks, low_value_tasks = focus_split(productivity_data, productivity_data['Priority Score'])
         st.subheader("🔹 High-Value Tasks (Focus) - 20%")
         st.dataframe(high_value_tasks[['Task Name', 'Priority', 'Due Date', 'Days Until Due', 'Priority Score', 'Status']])
                
@@ -462,15 +768,56 @@ with tab3:
     
     st.subheader("Update Task Status")
     if not productivity_data.empty and "Task Name" in productivity_data.columns:
-        task_options = [f"{index} {row['Task Name']}  {row['Priority']}  {row['Due Date']}" for index, row in productivity_data.iterrows()]
-        selected_task = st.selectbox("Select Task to Update", task_options, key="productivity_task_selectbox")
+        task_index = pick_row(productivity_data, "productivity_task", "Select Task to Update",
+                              ["Task Name", "Priority", "Due Date"], ["Task Name", "Priority", "Status"])
         new_status = st.selectbox("Update Status", ["Not Started", "In Progress", "Completed"], key="productivity_status_selectbox")
-        if st.button("Update Task Status"):
-            spreadsheet = client.open("Project Management")
-            worksheet = spreadsheet.worksheet("Personal Productivity")
-            task_index = int(selected_task.split()[0])  # Extract Index
-            worksheet.update_cell(task_index + 2, worksheet.find("Status").col, new_status)
+        if st.button("Update Task Status") and task_index is not None:
+            selected_task = productivity_data.at[task_index, "Task Name"]
+            task_fields = {"Status": new_status}
             if new_status == "Completed":
                 current_date = datetime.now(est).strftime("%Y-%m-%d")
-                worksheet.update_cell(task_index + 2, worksheet.find("Actual Close Date").col, current_date)
-            st.success(f"Status updated for Task '{selected_task}' to '{new_status}'!")
+                task_fields["Actual Close Date"] = current_date
+            if update_in_google_sheets(task_index + 2, task_fields, "Project Management", "Personal Productivity"):
+                st.success(f"Status updated for Task '{selected_task}' to '{new_status}'!")
+
+# Only the selected view runs and loads its data (st.tabs would run all three)
+VIEWS = {"Downtime Issues": downtime_tab, "KPI Dashboard": kpi_tab, "Personal Productivity": productivity_tab}
+selected_view = st.radio("View", list(VIEWS), horizontal=True, key="selected_view", label_visibility="collapsed")
+VIEWS[selected_view]()
+
+# Versions, row counts and edit counts of the worksheets as this server
+# process has them. Rows added or edited by any session, or picked up by the
+# change watcher, change it; reading it makes no Sheets API calls.
+def data_stamp():
+    return tuple((backend.version(sheet_name, worksheet_name), backend.row_count(sheet_name, worksheet_name),
+                  len(backend.edits(sheet_name, worksheet_name)))
+                 for sheet_name, worksheet_name, _ in MIRRORED_WORKSHEETS)
+
+# Rerun the page when the data changed since this session last drew it, so
+# open views stay current on every tablet without anyone interacting
+@st.fragment(run_every=get_setting("live_refresh_interval", DEFAULT_LIVE_REFRESH_INTERVAL) or None)
+def live_refresh():
+    if st.session_state.get("data_stamp") != data_stamp():
+        st.rerun()
+
+st.session_state.data_stamp = data_stamp()
+live_refresh()
+
+# Performance panel (debug_panel = true in secrets): where this rerun spent its
+# time and which Sheets API calls it made, with the last reruns for export
+finish_recorder(recorder)
+if get_setting("debug_panel", False):
+    with st.sidebar.expander("Performance"):
+        st.caption(f"Rerun {recorder.rerun}: {recorder.seconds:.3f} s")
+        st.dataframe(recorder.sections_frame())
+        st.caption("Chart cache")
+        st.json(get_chart_cache().stats())
+        st.caption("Sheets API calls this rerun")
+        st.dataframe(recorder.calls_frame())
+        if backend.name != "sqlite":
+            st.caption("Sheets API calls since the server started (all sessions)")
+            st.dataframe(get_api_totals().frame())
+        st.download_button("Export JSON", export_json(st.session_state.reruns), file_name="timings.json",
+                           mime="application/json", key="export_timings_json")
+        st.download_button("Export CSV", export_csv(st.session_state.reruns), file_name="timings.csv",
+                           mime="text/csv", key="export_timings_csv")
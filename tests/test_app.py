@@ -0,0 +1,41 @@
+import time
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.fake_gspread import demo_clients
+
+APP = Path(__file__).resolve().parent.parent / "streamlit_app.py"
+
+
+def _app(tmp_path):
+    st.cache_resource.clear()
+    at = AppTest.from_file(str(APP), default_timeout=120)
+    at.secrets.update({"demo_rows": 200, "write_queue_path": str(tmp_path / "write_queue.db"),
+                       "change_poll_interval": 0, "live_refresh_interval": 0})
+    return at.run()
+
+
+def _button(at, label):
+    return next(button for button in at.button if button.label == label)
+
+
+def test_add_then_edit(tmp_path):
+    at = _app(tmp_path)
+    assert not at.exception
+
+    at.text_input[1].input("Line X")
+    at.text_input[2].input("Jam")
+    _button(at, "Add Data").click().run()
+    assert not at.exception and not at.warning
+
+    time.sleep(2)  # the write queue sends the row
+    at.run()
+    assert demo_clients[-1].spreadsheets["Project Management"].worksheets["Downtime Issues"].rows[-1][3] == "Line X"
+
+    _button(at, "Update Entry").click().run()
+    assert not at.exception
+    _button(at, "Update Downtime Status").click().run()
+    assert not at.exception and not at.error
+    assert any("Status updated" in message.value for message in at.success)
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from benchmarks.datasets import downtime_rows
+from report import run_reports, write_reports
+
+
+def test_reports_with_a_failing_site(tmp_path):
+    good = tmp_path / "good.csv"
+    downtime_rows(200).to_csv(good, index=False)
+    sources = [("good", str(good)), ("missing", str(tmp_path / "missing.csv"))]
+
+    results = run_reports(sources, workers=1)
+    summary = write_reports(results, tmp_path / "reports")
+
+    assert "error" in results[1] and "error" not in results[0]
+    assert list(summary["site"]) == ["good", "missing"]
+    assert summary.loc[0, "total_issues"] == 200
+    report = (tmp_path / "reports" / "report.md").read_text()
+    assert "| good |" in report and "| missing |" in report
+    assert "Failed: FileNotFoundError" in report
+    assert len(pd.read_csv(tmp_path / "reports" / "summary.csv")) == 2
+
+
+def test_missing_db_is_an_error(tmp_path):
+    missing = tmp_path / "typo.db"
+    results = run_reports([("typo", str(missing))], workers=1)
+    assert results[0]["error"].startswith("FileNotFoundError")
+    assert not missing.exists()
@@ -0,0 +1,46 @@
+from benchmarks.datasets import downtime_rows
+from benchmarks.fake_gspread import FakeClient
+from keys import KeyIndex
+from sheets import WorksheetCache, appended_row
+from storage import SheetsBackend
+
+SHEET = "Project Management"
+DOWNTIME = "Downtime Issues"
+
+
+def _backend(rows=5):
+    client = FakeClient()
+    client.add_dataframe(SHEET, DOWNTIME, downtime_rows(rows))
+    backend = SheetsBackend(client, WorksheetCache(ttl=None))
+    backend.load(SHEET, DOWNTIME, incremental=True)
+    return client, backend
+
+
+def test_appended_row():
+    assert appended_row({"updates": {"updatedRange": "'Downtime Issues'!A120:K121"}}) == 120
+    assert appended_row({"updates": {"updatedRange": "Sheet1!$A$7:$C$7"}}) == 7
+    assert appended_row(None) is None
+
+
+def test_own_append_patches_the_cache():
+    client, backend = _backend()
+    client.reset_counters()
+    backend.append(SHEET, DOWNTIME, downtime_rows(2, seed=1))
+    data = backend.load(SHEET, DOWNTIME, incremental=True)
+    assert len(data) == 7
+    assert client.calls["get"] == 0 and client.calls["get_all_records"] == 0
+
+
+def test_append_after_another_writer():
+    client, backend = _backend()
+    other = downtime_rows(1, seed=2)
+    client.spreadsheets[SHEET].worksheets[DOWNTIME].append_rows(other.astype(str).values.tolist())
+    ours = downtime_rows(1, seed=3)
+    backend.append(SHEET, DOWNTIME, ours)
+
+    data = backend.load(SHEET, DOWNTIME, incremental=True)
+    assert list(data["Key"].iloc[-2:]) == [other["Key"].iloc[0], ours["Key"].iloc[0]]
+    assert client.calls["get_all_records"] == 1  # the tail was read, not the whole sheet
+    keys = KeyIndex()
+    keys.sync(data)
+    assert keys.row(ours["Key"].iloc[0]) == 8
@@ -0,0 +1,59 @@
+from benchmarks.datasets import downtime_rows
+from benchmarks.fake_gspread import FakeClient
+from sheets import WorksheetCache
+from storage import SheetsBackend
+from write_queue import WriteQueue
+
+SHEET = "Project Management"
+DOWNTIME = "Downtime Issues"
+
+
+# Appends that go through but report a timeout the first `timeouts` times
+class TimingOutBackend(SheetsBackend):
+    def __init__(self, client, cache, timeouts):
+        super().__init__(client, cache)
+        self.timeouts = timeouts
+
+    def append(self, sheet_name, worksheet_name, rows):
+        super().append(sheet_name, worksheet_name, rows)
+        if self.timeouts:
+            self.timeouts -= 1
+            raise TimeoutError("The read operation timed out")
+
+
+def _queue(tmp_path, timeouts, **options):
+    client = FakeClient()
+    client.add_dataframe(SHEET, DOWNTIME, downtime_rows(10))
+    backend = TimingOutBackend(client, WorksheetCache(ttl=None), timeouts)
+    backend.load(SHEET, DOWNTIME, incremental=True)
+    queue = WriteQueue(backend, path=str(tmp_path / "queue.db"), backoff_base=0.0, **options)
+    return client.spreadsheets[SHEET].worksheets[DOWNTIME], queue
+
+
+def _retry_now(queue):
+    with queue._conn:
+        queue._conn.execute("UPDATE writes SET next_attempt = 0")
+    queue.flush()
+
+
+def test_retry_skips_rows_already_written(tmp_path):
+    worksheet, queue = _queue(tmp_path, timeouts=1)
+    queue.enqueue(SHEET, DOWNTIME, downtime_rows(3, seed=1))
+    queue.flush()
+    assert queue.counts()["pending"] == 3
+    _retry_now(queue)
+    assert queue.counts() == {"pending": 0, "failed": 0, "written": 3}
+    assert len(worksheet.rows) == 13
+
+
+def test_retries_are_capped(tmp_path):
+    worksheet, queue = _queue(tmp_path, timeouts=0, max_attempts=3)
+
+    def offline(*args):
+        raise ConnectionError("offline")
+
+    queue.backend.append = offline
+    queue.enqueue(SHEET, DOWNTIME, downtime_rows(1, seed=2))
+    for _ in range(3):
+        _retry_now(queue)
+    assert queue.counts()["failed"] == 1
@@ -0,0 +1,125 @@
+import contextlib
+import threading
+import time
+
+from sheets import DEFAULT_TAIL_ROWS
+
+
+# Default seconds between checks of the sheets for changes made elsewhere
+DEFAULT_POLL_INTERVAL = 15
+
+# Default seconds between each session's (in-memory) check for new data
+DEFAULT_LIVE_REFRESH_INTERVAL = 5
+
+
+# Watches Google Sheets for changes made outside this server process (other
+# deployments, the sheet itself) with cheap signals instead of full reads:
+# each poll costs one Drive call per spreadsheet for its revision (last
+# modification time), and only when that moved one tail read per append-only
+# worksheet (see probe_worksheet), which adds new rows to the shared cache or
+# re-downloads a worksheet whose tail was edited. Other worksheets can change
+# anywhere, so their cached copy is dropped instead and read again when next
+# needed. Changes made by this process's own writes are recognised (see
+# own_write) and skipped. Runs once per process, so the cost doesn't grow with
+# the number of sessions; after a poll that found changes,
+# on_change([(sheet_name, worksheet_name), ...]) is called once with them.
+class ChangeWatcher:
+    def __init__(self, backend, worksheets, tail_rows=DEFAULT_TAIL_ROWS, on_change=None):
+        self.backend = backend  # a SheetsBackend
+        self.worksheets = list(worksheets)  # (sheet_name, worksheet_name, append-only)
+        self.tail_rows = tail_rows
+        self.on_change = on_change
+        self.polls = 0
+        self.probes = 0
+        self.changes = 0
+        self.last_poll = None
+        self.last_change = None
+        self.last_error = None
+        self._revisions = {}
+        self._own_revisions = {}
+        self._thread = None
+        self._lock = threading.Lock()
+        backend.write_watchers.append(self)
+
+    # Wrapped by the backend around its own writes to a spreadsheet. When the
+    # revision before the write is one already accounted for (nothing else
+    # changed it since), the revision after it is ours and polls skip it.
+    # Costs two Drive calls per write; the write queue sends rows in batches.
+    @contextlib.contextmanager
+    def own_write(self, sheet_name):
+        try:
+            before = self.backend.revision(sheet_name)
+        except Exception:  # no Drive access: the write is seen as a change
+            before = None
+        yield
+        try:
+            after = self.backend.revision(sheet_name)
+        except Exception:
+            return
+        with self._lock:
+            if before is not None and before in (self._revisions.get(sheet_name), self._own_revisions.get(sheet_name)):
+                self._own_revisions[sheet_name] = after
+
+    # Check every watched worksheet once; returns the ones that changed
+    def poll(self):
+        changed = []
+        with self._lock:
+            for sheet_name in dict.fromkeys(sheet for sheet, _, _ in self.worksheets):
+                try:
+                    revision = self.backend.revision(sheet_name)
+                except Exception:  # no Drive access: probe on every poll instead
+                    revision = None
+                if revision is not None and revision in (self._revisions.get(sheet_name),
+                                                         self._own_revisions.get(sheet_name)):
+                    self._revisions[sheet_name] = revision
+                    continue
+                checked = True
+                for worksheet_sheet, worksheet_name, append_only in self.worksheets:
+                    if worksheet_sheet != sheet_name:
+                        continue
+                    if not append_only:
+                        # Without a revision there is no telling whether it changed
+                        if revision is not None:
+                            self.backend.refresh(sheet_name, worksheet_name)
+                            changed.append((sheet_name, worksheet_name))
+                        continue
+                    self.probes += 1
+                    result = self.backend.probe(sheet_name, worksheet_name, self.tail_rows)
+                    if result in ("appended", "reloaded"):
+                        changed.append((sheet_name, worksheet_name))
+                    checked &= result is not None
+                # The revision was read before the probes, so a change made
+                # while probing is still seen on the next poll
+                if checked:
+                    self._revisions[sheet_name] = revision
+            self.polls += 1
+            self.last_poll = time.time()
+            if changed:
+                self.changes += len(changed)
+                self.last_change = self.last_poll
+        if self.on_change is not None and changed:
+            self.on_change(changed)
+        return changed
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:  # keep watching after transient API errors
+                self.last_error = str(e)
+
+    # Poll in a daemon thread every interval seconds
+    def start(self, interval=DEFAULT_POLL_INTERVAL):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True, name="sheets-watch")
+            self._thread.start()
+
+    def stats(self):
+        def clock(timestamp):
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else None
+
+        return {"polls": self.polls, "probes": self.probes, "changes": self.changes,
+                "last_poll": clock(self.last_poll), "last_change": clock(self.last_change),
+                "last_error": self.last_error}
@@ -0,0 +1,262 @@
+import itertools
+import json
+import random
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+
+# Default location of the durable queue
+DEFAULT_QUEUE_PATH = "write_queue.db"
+
+# Seconds to wait after a submission so a burst of them goes out as one append
+DEFAULT_BATCH_DELAY = 1.0
+
+# Most rows sent in a single append_rows call
+DEFAULT_MAX_BATCH = 2000
+
+# Batches read from the queue per flush, so a large import is never loaded into memory at once
+FLUSH_BATCHES = 5
+
+# Exponential backoff between retries: base * 2**attempts, capped, with jitter
+DEFAULT_BACKOFF_BASE = 2.0
+DEFAULT_BACKOFF_MAX = 300.0
+
+# Tries per row before it is marked failed (and kept for a manual retry)
+DEFAULT_MAX_ATTEMPTS = 8
+
+# HTTP status codes worth retrying (quota exceeded and server-side errors)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+# True when a failed append may succeed if tried again later
+def is_retryable(error):
+    import gspread
+    import requests
+    if isinstance(error, gspread.exceptions.APIError):
+        status = getattr(error, "code", None) or getattr(getattr(error, "response", None), "status_code", None)
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (requests.exceptions.RequestException, ConnectionError, TimeoutError))
+
+
+# Durable write-behind queue for appends. Rows are stored in a local SQLite
+# file as soon as they are submitted; a background thread sends them to the
+# storage backend in batches (one append per worksheet and column layout),
+# retrying quota and transient errors with exponential backoff, up to
+# max_attempts tries. A timed-out append may have reached the sheet anyway,
+# so before a retry the rows whose Key is already there are taken out rather
+# than written twice. Rows that fail for good are kept with status "failed"
+# until retried, never dropped.
+class WriteQueue:
+    def __init__(self, backend, path=DEFAULT_QUEUE_PATH, batch_delay=DEFAULT_BATCH_DELAY,
+                 max_batch=DEFAULT_MAX_BATCH, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.backend = backend
+        self.path = path
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+        self.written = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS writes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " sheet_name TEXT NOT NULL,"
+            " worksheet_name TEXT NOT NULL,"
+            " columns TEXT NOT NULL,"
+            " row TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL DEFAULT 0,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS writes_target ON writes"
+                           " (status, sheet_name, worksheet_name, id)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # Store the rows of data for a later append and wake the writer
+    def enqueue(self, sheet_name, worksheet_name, data):
+        columns = json.dumps([str(c) for c in data.columns])
+        now = time.time()
+        rows = [
+            (sheet_name, worksheet_name, columns, json.dumps(row, default=str), now)
+            for row in data.astype(object).where(data.notna(), "").values.tolist()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO writes (sheet_name, worksheet_name, columns, row, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._wake.set()
+        return len(rows)
+
+    # Send due pending rows, oldest first (up to FLUSH_BATCHES batches' worth
+    # per worksheet; the writer keeps flushing while rows remain). Rows for one
+    # worksheet are sent in order; after a failure the rest of that worksheet
+    # waits for the retry, without holding up the other worksheets.
+    def flush(self):
+        with self._flush_lock:
+            now = time.time()
+            with self._lock:
+                # First row still backing off per worksheet; only the rows before it are due
+                blocked = {(sheet, worksheet): first for sheet, worksheet, first in self._conn.execute(
+                    "SELECT sheet_name, worksheet_name, MIN(id) FROM writes"
+                    " WHERE status = 'pending' AND next_attempt > ? GROUP BY sheet_name, worksheet_name", (now,)
+                )}
+                targets = self._conn.execute(
+                    "SELECT DISTINCT sheet_name, worksheet_name FROM writes WHERE status = 'pending'"
+                ).fetchall()
+                due = []
+                for target in targets:
+                    due += self._conn.execute(
+                        "SELECT id, sheet_name, worksheet_name, columns, row, attempts FROM writes"
+                        " WHERE status = 'pending' AND sheet_name = ? AND worksheet_name = ? AND id < ?"
+                        " ORDER BY id LIMIT ?",
+                        target + (blocked.get(target, float("inf")), self.max_batch * FLUSH_BATCHES),
+                    ).fetchall()
+
+            # (sheet, worksheet) -> [(columns, rows), ...], consecutive rows with the
+            # same column layout share one append
+            batches = {}
+            for row in due:
+                target, columns = row[1:3], row[3]
+                target_batches = batches.setdefault(target, [])
+                if target_batches and target_batches[-1][0] == columns and len(target_batches[-1][1]) < self.max_batch:
+                    target_batches[-1][1].append(row)
+                else:
+                    target_batches.append((columns, [row]))
+
+            for target, target_batches in batches.items():
+                for columns, rows in target_batches:
+                    if not self._send(target, columns, rows):
+                        break
+            return len(due)
+
+    def _send(self, target, columns, batch):
+        sheet_name, worksheet_name = target
+        ids = [row[0] for row in batch]
+        data = pd.DataFrame([json.loads(row[4]) for row in batch], columns=json.loads(columns))
+        try:
+            if any(row[5] for row in batch) and "Key" in data.columns:
+                written = data["Key"].isin(self.backend.find_keys(sheet_name, worksheet_name, data["Key"].tolist()))
+                if written.any():
+                    self._written([i for i, done in zip(ids, written) if done])
+                    ids = [i for i, done in zip(ids, written) if not done]
+                    data = data[~written.to_numpy()]
+            if len(data):
+                self.backend.append(sheet_name, worksheet_name, data)
+        except Exception as e:
+            attempts = max(row[5] for row in batch) + 1
+            if is_retryable(e) and attempts < self.max_attempts:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempts) * random.uniform(0.5, 1.0)
+                status, next_attempt = "pending", time.time() + delay
+            else:
+                status, next_attempt = "failed", 0
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "UPDATE writes SET status = ?, attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                    [(status, attempts, next_attempt, f"{type(e).__name__}: {e}", i) for i in ids],
+                )
+            return False
+        self._written(ids)
+        return True
+
+    def _written(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM writes WHERE id = ?", [(i,) for i in ids])
+            self.written += len(ids)
+
+    # Put failed rows back in line and try them right away, with a fresh
+    # count of tries (still checked for Keys already written first)
+    def retry_failed(self):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE writes SET status = 'pending', next_attempt = 0, attempts = MIN(attempts, 1)"
+                               " WHERE status = 'failed'")
+        self._wake.set()
+
+    # Rows still waiting to be written, one per queued row (the first limit rows when given)
+    def pending(self, sheet_name=None, worksheet_name=None, limit=None):
+        sql = ("SELECT id, sheet_name, worksheet_name, columns, row, status, attempts, next_attempt, last_error,"
+               " created_at FROM writes")
+        params = ()
+        if sheet_name is not None:
+            sql += " WHERE sheet_name = ? AND worksheet_name = ?"
+            params = (sheet_name, worksheet_name)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY id" + (" LIMIT ?" if limit else ""),
+                                      params + ((limit,) if limit else ())).fetchall()
+        records = []
+        for row_id, sheet, worksheet, columns, values, status, attempts, next_attempt, error, created_at in rows:
+            record = {
+                "Queued": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created_at)),
+                "Worksheet": worksheet,
+                "Write Status": status,
+                "Attempts": attempts,
+                "Next Attempt": (time.strftime("%H:%M:%S", time.localtime(next_attempt)) if next_attempt else ""),
+                "Last Error": error or "",
+            }
+            record.update(zip(json.loads(columns), json.loads(values)))
+            records.append(record)
+        return pd.DataFrame(records)
+
+    # Rows of a worksheet still waiting to be written (pending or failed), as
+    # frames of up to chunksize rows in the columns they were queued with
+    def queued_rows(self, sheet_name, worksheet_name, chunksize=DEFAULT_MAX_BATCH):
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, columns, row FROM writes WHERE sheet_name = ? AND worksheet_name = ? AND id > ?"
+                    " ORDER BY id LIMIT ?", (sheet_name, worksheet_name, last_id, chunksize)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for columns, group in itertools.groupby(rows, key=lambda row: row[1]):
+                yield pd.DataFrame([json.loads(row[2]) for row in group], columns=json.loads(columns))
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM writes GROUP BY status").fetchall()
+        counts = {"pending": 0, "failed": 0}
+        counts.update(dict(rows))
+        counts["written"] = self.written
+        return counts
+
+    def _run(self):
+        sent = 0
+        while True:
+            # Right away while the last flush had rows to send, otherwise at
+            # the next retry (rows queued behind one wait for it too)
+            now = time.time()
+            with self._lock:
+                next_attempt = self._conn.execute(
+                    "SELECT MIN(next_attempt) FROM writes WHERE status = 'pending' AND next_attempt > ?",
+                    (-1.0 if sent else now,)
+                ).fetchone()[0]
+            timeout = None if next_attempt is None else max(0.0, next_attempt - now)
+            self._wake.wait(timeout)
+            self._wake.clear()
+            time.sleep(self.batch_delay)  # let a burst of submissions pile up
+            try:
+                sent = self.flush()
+            except Exception:  # keep the writer alive; rows stay queued and are tried again
+                sent = 1
+                time.sleep(self.backoff_base)
+
+    # Start the background writer (also sends anything left over from a restart)
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="write-queue")
+            self._thread.start()
+            self._wake.set()